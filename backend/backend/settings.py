@@ -139,7 +139,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.CachedJWTAuthentication",
     ),
 }
 
@@ -148,4 +148,13 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
 }
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Pooler engine tuning (see core/pooler_engine/config.py for defaults)
+
+POOLER_ENGINE = {
+    "executor": {
+        "max_workers": int(os.getenv('POOLER_MAX_WORKERS', 100)),
+        "max_pending": int(os.getenv('POOLER_MAX_PENDING', 5000)),
+    },
+}
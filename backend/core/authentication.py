@@ -0,0 +1,116 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+TOKEN_VERSION_CLAIM = "token_version"
+
+DEFAULT_USER_CACHE = {
+    "max_entries": 10000,
+    # Bounds how long another process can serve a user changed elsewhere
+    "ttl_seconds": 300,
+}
+
+
+class UserCache:
+    """
+    Bounded LRU of authenticated users, keyed by (user id, token version).
+    """
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, user):
+        with self._lock:
+            self._entries[key] = (user, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Drops every cached version of a user."""
+        user_id = str(user_id)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                config = {**DEFAULT_USER_CACHE, **getattr(settings, "AUTH_USER_CACHE", {})}
+                _user_cache = UserCache(config["max_entries"], config["ttl_seconds"])
+    return _user_cache
+
+
+def invalidate_user(user):
+    """
+    Call after saving changes to a user: bumps its token version, so tokens
+    issued from now on never match an older cached copy, and evicts it from
+    this process's cache.
+    """
+    type(user).objects.filter(pk=user.pk).update(token_version=F("token_version") + 1)
+    user.refresh_from_db(fields=["token_version"])
+    get_user_cache().invalidate(user.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from an in-process cache, so the
+    common case needs no database round trip.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        cache = get_user_cache()
+        key = (str(user_id), validated_token.get(TOKEN_VERSION_CLAIM))
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.put(key, user)
+        else:
+            self._check_user(user, validated_token)
+        # Views may modify request.user; keep the cached copy untouched
+        return copy.copy(user)
+
+    def _check_user(self, user, validated_token):
+        # The same checks simplejwt applies after loading the user
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
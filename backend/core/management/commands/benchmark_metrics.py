@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+from django.core.management.base import BaseCommand
+from core.pooler_engine.metrics import LatencyHistogram, MetricsRecorder
+from core.pooler_engine.perfsuite import record_request
+from core.pooler_engine.tracing import PHASES, RequestTrace
+
+
+class _SingleLockRecorder:
+    """Reference: every call takes one shared lock, as MetricsRecorder used to."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.successful_requests = 0
+        self.connections_reused = 0
+        self.peak_active_connections = 0
+        self.queue_wait_times = []
+        self.phase_histograms = {phase: LatencyHistogram() for phase in PHASES}
+        self.request_histogram = LatencyHistogram()
+
+    def record_request(self, trace):
+        with self._lock:
+            self.queue_wait_times.append(1.0)
+        with self._lock:
+            self.connections_reused += 1
+        with self._lock:
+            self.peak_active_connections = max(self.peak_active_connections, 4)
+        with self._lock:
+            self.successful_requests += 1
+        durations = trace.durations_ms()
+        with self._lock:
+            for phase, ms in durations.items():
+                self.phase_histograms[phase].record(ms)
+            self.request_histogram.record(sum(durations.values()))
+
+
+def _record_request_locked(metrics, trace):
+    metrics.record_request(trace)
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark the metrics hot path under thread contention."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32, 100])
+        parser.add_argument("--requests", type=int, default=20000,
+                            help="Requests recorded per thread")
+
+    def _run(self, factory, record, threads, requests):
+        metrics = factory()
+        trace = RequestTrace()
+        trace.finish()
+        barrier = threading.Barrier(threads + 1)
+
+        def worker():
+            barrier.wait()
+            for _ in range(requests):
+                record(metrics, trace)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in workers:
+            t.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+        return {
+            "threads": threads,
+            "requests": threads * requests,
+            "ns_per_request": round(elapsed * 1e9 / (threads * requests), 1),
+        }
+
+    def handle(self, *args, **options):
+        results = {"sharded": [], "single_lock": []}
+        for threads in options["threads"]:
+            results["sharded"].append(self._run(
+                MetricsRecorder, record_request, threads, options["requests"]
+            ))
+            results["single_lock"].append(self._run(
+                _SingleLockRecorder, _record_request_locked, threads, options["requests"]
+            ))
+        self.stdout.write(json.dumps(results, indent=2))
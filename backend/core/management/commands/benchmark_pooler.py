@@ -0,0 +1,58 @@
+import json
+from contextlib import nullcontext
+from django.core.management.base import BaseCommand, CommandError
+from core.models import UserDatabase, Workload
+from core.pooler_engine.pool_manager import ConnectionPooler
+from core.pooler_engine.profiler import build_profiler, profiler_top_n
+from core.pooler_engine.workload import TEST_QUERY, compile_workload
+
+
+class Command(BaseCommand):
+    help = "Run a pooler benchmark against a registered database, optionally profiled."
+
+    def add_arguments(self, parser):
+        parser.add_argument("db_id", type=int, help="UserDatabase id to benchmark")
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--workload", type=int,
+                            help="Saved Workload id to run instead of the fixed query")
+        parser.add_argument("--seed", type=int, help="Seed for workload parameter generation")
+        parser.add_argument("--profile", action="store_true",
+                            help="Sample pooler thread stacks during the run")
+        parser.add_argument("--profile-out",
+                            help="Write collapsed stacks to this file (flamegraph.pl input)")
+
+    def handle(self, *args, **options):
+        try:
+            user_db = UserDatabase.objects.get(id=options["db_id"])
+        except UserDatabase.DoesNotExist:
+            raise CommandError(f"Database {options['db_id']} not found")
+
+        if options["workload"]:
+            try:
+                workload = Workload.objects.get(id=options["workload"], user_db=user_db)
+            except Workload.DoesNotExist:
+                raise CommandError(f"Workload {options['workload']} not found for this database")
+            statements = compile_workload(workload.statements).generate(
+                options["requests"], options["seed"]
+            )
+        else:
+            statements = [(TEST_QUERY, None, True)] * options["requests"]
+
+        profiler = build_profiler() if options["profile"] or options["profile_out"] else None
+        pooler = ConnectionPooler(user_db)
+        try:
+            with profiler or nullcontext():
+                metrics = pooler.execute_statements(statements, caller="benchmark")
+        finally:
+            pooler.shutdown()
+
+        output = {"metrics": metrics}
+        if profiler:
+            report = profiler.report(profiler_top_n())
+            if options["profile_out"]:
+                with open(options["profile_out"], "w") as f:
+                    f.write(report["collapsed_stacks"] + "\n")
+                report.pop("collapsed_stacks")
+            output["profile"] = report
+
+        self.stdout.write(json.dumps(output, indent=2))
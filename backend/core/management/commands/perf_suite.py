@@ -0,0 +1,66 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.models import UserDatabase
+from core.pooler_engine.perfsuite import (
+    BENCHMARKS, SUITE_VERSION, build_baseline, compare, load_baseline, run_suite, save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the pooler performance suite and compare it with the stored baseline. "
+        "Fails if throughput drops or p99 rises by more than the tolerance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--baseline", default=str(settings.BASE_DIR / "perf_baseline.json"),
+                            help="Baseline JSON file")
+        parser.add_argument("--update", action="store_true",
+                            help="Write these results as the new baseline instead of comparing")
+        parser.add_argument("--tolerance", type=float, default=0.15,
+                            help="Allowed relative regression, e.g. 0.15 for 15%%")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS),
+                            help="Run only these benchmarks")
+        parser.add_argument("--db-id", type=int,
+                            help="Run the end-to-end benchmark against this UserDatabase "
+                                 "instead of the in-process stand-in")
+
+    def handle(self, *args, **options):
+        user_db = None
+        if options["db_id"]:
+            try:
+                user_db = UserDatabase.objects.get(id=options["db_id"])
+            except UserDatabase.DoesNotExist:
+                raise CommandError(f"Database {options['db_id']} not found")
+        target = f"database:{user_db.id}" if user_db else "standin"
+
+        results = run_suite(options["only"], options["repeat"], user_db)
+        baseline = load_baseline(options["baseline"])
+
+        if options["update"] or baseline is None:
+            if baseline is not None and options["only"] and baseline.get("version") == SUITE_VERSION:
+                # Keep the benchmarks that weren't rerun
+                results = {**baseline["benchmarks"], **results}
+            save_baseline(options["baseline"], build_baseline(results, target))
+            self.stdout.write(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        if baseline.get("version") != SUITE_VERSION:
+            raise CommandError(
+                f"Baseline is for suite version {baseline.get('version')}, this is "
+                f"version {SUITE_VERSION}; rerun with --update"
+            )
+        if baseline.get("target") != target:
+            raise CommandError(
+                f"Baseline was recorded against {baseline.get('target')}, not {target}"
+            )
+
+        rows = compare(results, baseline, options["tolerance"])
+        self.stdout.write(json.dumps(rows, indent=2))
+        regressed = [row["benchmark"] for row in rows if row["status"] == "regressed"]
+        if regressed:
+            raise CommandError(f"Performance regression in: {', '.join(regressed)}")
+        self.stdout.write(self.style.SUCCESS("No regressions beyond tolerance"))
@@ -19,6 +19,12 @@ class User(AbstractUser):
     username = None
     email = models.EmailField(unique=True)
     full_name = models.CharField(max_length=100)
+    # Bumped whenever the user changes, so cached auth lookups go stale
+    token_version = models.PositiveIntegerField(default=0)
+    # Bumped whenever one of the user's databases or pool configs changes;
+    # backs the ETag/Last-Modified validators on the database endpoints
+    databases_version = models.PositiveIntegerField(default=0)
+    databases_changed_at = models.DateTimeField(null=True, blank=True)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []  # no username required
@@ -64,3 +70,15 @@ class PoolerConfig(models.Model):
 
     def __str__(self):
         return f"PoolConfig for {self.user_db.dbname}"
+
+
+
+class Workload(models.Model):
+    user_db = models.ForeignKey(UserDatabase, on_delete=models.CASCADE, related_name="workloads")
+    name = models.CharField(max_length=100)
+    statements = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.user_db.dbname})"
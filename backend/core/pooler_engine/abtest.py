@@ -0,0 +1,245 @@
+# pooler_engine/abtest.py
+
+"""
+Interleaved pooled-vs-direct comparison
+Runs several trials of each mode in a randomised order per round, with the
+same statements and the same executor concurrency, then compares the modes
+by their median run time with bootstrap confidence intervals and a
+Mann-Whitney U test.
+"""
+
+import math
+import random
+import statistics
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from .config import get_engine_config
+from .context import Deadline, RequestContext
+from .db_client import execute_db_query
+from .executor import get_executor, ExecutorRejected
+from .pool_manager import ConnectionPooler
+from .resources import ResourceAccountant
+
+POOLED = "with_pooler"
+DIRECT = "without_pooler"
+
+BOOTSTRAP_RESAMPLES = 2000
+# Largest sample for which the exact U distribution is computed
+EXACT_MANN_WHITNEY_MAX = 20
+
+
+def run_direct(user_db, statements, caller=None, accountant=None, request_budget=None):
+    """
+    Runs every statement on its own fresh connection through the shared
+    executor, the same way the pooled mode submits them: each request gets a
+    `request_budget`-second deadline (default: the statement timeout) and is
+    cancelled on the server once the caller stops waiting for it.
+    """
+    deadline_config = get_engine_config("deadline")
+    if request_budget is None:
+        request_budget = deadline_config["statement_timeout_ms"] / 1000
+    cancel_grace = deadline_config["cancel_grace_ms"] / 1000
+    successful = 0
+
+    def execute_direct_query(query, params, ctx):
+        execute_db_query(user_db, query, params, ctx)
+
+    task = accountant.wrap(execute_direct_query) if accountant else execute_direct_query
+    executor = get_executor()
+    started = time.time()
+    pending = []
+    for request_id, (query, params, _) in enumerate(statements):
+        ctx = RequestContext(Deadline(request_budget), None, request_id)
+        try:
+            pending.append((ctx, executor.submit(caller, task, query, params, ctx)))
+        except ExecutorRejected as e:
+            print(f"Direct query rejected: {e}")
+    for ctx, f in pending:
+        try:
+            f.result(timeout=ctx.deadline.remaining() + cancel_grace)
+            successful += 1
+        except FutureTimeoutError:
+            # Give up on the request and stop its query on the server
+            ctx.cancel()
+        except Exception as e:
+            print(f"Direct query error: {e}")
+    return {
+        "successful_requests": successful,
+        "failed_connections": len(statements) - successful,
+        "total_execution_time_ms": (time.time() - started) * 1000,
+    }
+
+
+def median_ci(values, confidence=0.95, rng=None):
+    """Percentile-bootstrap confidence interval for the median."""
+    rng = rng or random.Random()
+    if len(values) < 2:
+        return [values[0], values[0]] if values else [0, 0]
+    medians = sorted(
+        statistics.median(rng.choices(values, k=len(values)))
+        for _ in range(BOOTSTRAP_RESAMPLES)
+    )
+    tail = (1 - confidence) / 2
+    return [medians[int(tail * len(medians))], medians[int((1 - tail) * len(medians)) - 1]]
+
+
+def difference_ci(a, b, confidence=0.95, rng=None):
+    """Percentile-bootstrap confidence interval for median(a) - median(b)."""
+    rng = rng or random.Random()
+    if not a or not b:
+        return [0, 0]
+    diffs = sorted(
+        statistics.median(rng.choices(a, k=len(a)))
+        - statistics.median(rng.choices(b, k=len(b)))
+        for _ in range(BOOTSTRAP_RESAMPLES)
+    )
+    tail = (1 - confidence) / 2
+    return [diffs[int(tail * len(diffs))], diffs[int((1 - tail) * len(diffs)) - 1]]
+
+
+def _exact_u_counts(n1, n2):
+    # counts[u] = number of orderings of n1 + n2 values giving U = u
+    table = {(0, 0): [1]}
+    for i in range(n1 + 1):
+        for j in range(n2 + 1):
+            if i == j == 0:
+                continue
+            counts = [0] * (i * j + 1)
+            if i:
+                for u, c in enumerate(table[(i - 1, j)]):
+                    counts[u + j] += c
+            if j:
+                for u, c in enumerate(table[(i, j - 1)]):
+                    counts[u] += c
+            table[(i, j)] = counts
+    return table[(n1, n2)]
+
+
+def mann_whitney_u(a, b):
+    """
+    Two-sided Mann-Whitney U test. Exact for small samples without ties,
+    otherwise the tie-corrected normal approximation.
+    """
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return {"u": 0, "p_value": 1.0, "method": "none"}
+    ranked = sorted((v, i) for i, v in enumerate(list(a) + list(b)))
+    ranks = [0.0] * (n1 + n2)
+    tie_term = 0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[ranked[k][1]] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    u1 = sum(ranks[:n1]) - n1 * (n1 + 1) / 2
+    u = min(u1, n1 * n2 - u1)
+
+    if not tie_term and max(n1, n2) <= EXACT_MANN_WHITNEY_MAX:
+        counts = _exact_u_counts(n1, n2)
+        p = 2 * sum(counts[:int(u) + 1]) / sum(counts)
+        return {"u": u, "p_value": round(min(1.0, p), 6), "method": "exact"}
+
+    n = n1 + n2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return {"u": u, "p_value": 1.0, "method": "normal"}
+    z = (abs(u - n1 * n2 / 2) - 0.5) / sigma
+    p = math.erfc(max(z, 0) / math.sqrt(2))
+    return {"u": u, "p_value": round(min(1.0, p), 6), "method": "normal"}
+
+
+class InterleavedComparison:
+    """
+    Runs `trials` rounds; each round runs both modes once, in random order.
+    Every pooled trial gets a fresh pool so trials stay independent.
+    """
+    def __init__(self, user_db, statements, pool_config, caller=None,
+                 trials=5, seed=None, trace_allocations=False, confidence=0.95):
+        self.user_db = user_db
+        self.statements = statements
+        self.pool_config = pool_config
+        self.caller = caller
+        self.trials = trials
+        self.rng = random.Random(seed)
+        self.trace_allocations = trace_allocations
+        self.confidence = confidence
+        self.results = {POOLED: [], DIRECT: []}
+        self.order = []
+
+    def _run_pooled(self, accountant):
+        pooler = ConnectionPooler(self.user_db, self.pool_config)
+        # Both modes must send every statement to the server
+        pooler.coalesce_reads = False
+        try:
+            return pooler.execute_statements(
+                self.statements, caller=self.caller, accountant=accountant
+            )
+        finally:
+            pooler.shutdown()
+
+    def _run_direct(self, accountant):
+        # The same per-request budget the pooled arm gives its requests
+        request_budget = (
+            self.pool_config["queue_timeout_ms"] + get_engine_config("deadline")["statement_timeout_ms"]
+        ) / 1000
+        return run_direct(self.user_db, self.statements, self.caller, accountant, request_budget)
+
+    def run(self):
+        modes = {POOLED: self._run_pooled, DIRECT: self._run_direct}
+        for _ in range(self.trials):
+            round_order = list(modes)
+            self.rng.shuffle(round_order)
+            self.order.append(round_order)
+            for mode in round_order:
+                accountant = ResourceAccountant(self.user_db, self.trace_allocations).start()
+                summary = modes[mode](accountant)
+                summary["resources"] = accountant.stop()
+                self.results[mode].append(summary)
+        return self.report()
+
+    def median_trial(self, mode):
+        """The trial whose run time is the median for `mode`."""
+        trials = sorted(self.results[mode], key=lambda r: r["total_execution_time_ms"])
+        return trials[(len(trials) - 1) // 2] if trials else None
+
+    def _arm(self, mode):
+        times = [r["total_execution_time_ms"] for r in self.results[mode]]
+        rps = [
+            r["successful_requests"] / (r["total_execution_time_ms"] / 1000)
+            if r["total_execution_time_ms"] > 0 else 0
+            for r in self.results[mode]
+        ]
+        return {
+            "trials": len(times),
+            "total_execution_time_ms": [round(t, 2) for t in times],
+            "median_time_ms": round(statistics.median(times), 2),
+            "median_time_ci_ms": [round(v, 2) for v in median_ci(times, self.confidence, self.rng)],
+            "median_rps": round(statistics.median(rps), 2),
+            "median_rps_ci": [round(v, 2) for v in median_ci(rps, self.confidence, self.rng)],
+            "successful_requests": sum(r["successful_requests"] for r in self.results[mode]),
+        }
+
+    def report(self):
+        pooled = [r["total_execution_time_ms"] for r in self.results[POOLED]]
+        direct = [r["total_execution_time_ms"] for r in self.results[DIRECT]]
+        median_direct = statistics.median(direct)
+        saved_ci = difference_ci(direct, pooled, self.confidence, self.rng)
+        test = mann_whitney_u(pooled, direct)
+        return {
+            "trials": self.trials,
+            "requests_per_trial": len(self.statements),
+            "confidence": self.confidence,
+            "order": self.order,
+            "arms": {POOLED: self._arm(POOLED), DIRECT: self._arm(DIRECT)},
+            "median_time_saved_ms": round(median_direct - statistics.median(pooled), 2),
+            "median_time_saved_ci_ms": [round(v, 2) for v in saved_ci],
+            "improvement_percent": round(
+                (median_direct - statistics.median(pooled)) / median_direct * 100, 2
+            ) if median_direct > 0 else 0,
+            "mann_whitney": test,
+            "significant": test["p_value"] < 1 - self.confidence,
+        }
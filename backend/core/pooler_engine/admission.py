@@ -0,0 +1,69 @@
+# pooler_engine/admission.py
+
+"""
+Queue-delay based admission control
+A CoDel-style controller: the pool reports how long every request waited for
+a slot, and when even the shortest wait over an interval stays above the
+target the queue is standing rather than absorbing a burst. While that holds,
+waiters give up after the target instead of the full queue timeout, so the
+pool fails fast under overload and keeps serving what it can.
+"""
+
+import time
+
+
+class CoDelController:
+    """
+    Tracks the minimum queue sojourn per interval. Not thread-safe on its own;
+    the pool calls it while holding its condition lock.
+    """
+    def __init__(self, target_ms, interval_ms, enabled=True):
+        self.enabled = enabled
+        self.target = target_ms / 1000
+        self.interval = interval_ms / 1000
+        self.overloaded = False
+        self.shed = 0
+        self._window_start = time.monotonic()
+        self._window_min = None
+        self._last_min = None
+
+    def _roll(self, now, waiting):
+        if now - self._window_start < self.interval:
+            return
+        if self._window_min is None:
+            # Nobody got a slot for a whole interval: standing queue if anyone waits
+            self.overloaded = waiting > 0
+        else:
+            self.overloaded = self._window_min > self.target
+        self._last_min = self._window_min
+        self._window_min = None
+        self._window_start = now
+
+    def record_sojourn(self, seconds, waiting=0):
+        """Called when a request gets a slot; an immediate slot counts as zero."""
+        now = time.monotonic()
+        if self._window_min is None or seconds < self._window_min:
+            self._window_min = seconds
+        self._roll(now, waiting)
+
+    def max_wait(self, queue_timeout, waiting=0):
+        """How long a queued request may wait for a slot right now."""
+        if not self.enabled:
+            return queue_timeout
+        self._roll(time.monotonic(), waiting)
+        return min(self.target, queue_timeout) if self.overloaded else queue_timeout
+
+    def record_shed(self):
+        self.shed += 1
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "target_ms": round(self.target * 1000),
+            "interval_ms": round(self.interval * 1000),
+            "overloaded": self.overloaded,
+            "last_min_sojourn_ms": (
+                round(self._last_min * 1000, 3) if self._last_min is not None else None
+            ),
+            "shed_requests": self.shed,
+        }
@@ -0,0 +1,196 @@
+# pooler_engine/buffering.py
+
+"""
+Bounded result buffering
+Rows are held in memory up to a per-request budget (also capped by a
+process-wide budget shared by every in-flight result). Anything beyond that
+spills to a temporary file as length-prefixed pickled rows and is read back
+lazily through mmap, so one oversized result can't exhaust the worker.
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import weakref
+from array import array
+from .config import get_engine_config
+
+_LENGTH = struct.Struct("<I")
+
+
+class MemoryBudget:
+    """
+    Process-wide byte budget for buffered rows.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.peak = 0
+        self.spilled_results = 0
+        self.spilled_bytes = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, nbytes):
+        with self._lock:
+            if self.in_use + nbytes > self.max_bytes:
+                return False
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+            return True
+
+    def release(self, nbytes):
+        with self._lock:
+            self.in_use -= nbytes
+
+    def record_spill(self, nbytes, new_result):
+        with self._lock:
+            self.spilled_bytes += nbytes
+            if new_result:
+                self.spilled_results += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "in_use_bytes": self.in_use,
+                "peak_bytes": self.peak,
+                "spilled_results": self.spilled_results,
+                "spilled_bytes": self.spilled_bytes,
+            }
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_memory_budget():
+    """
+    Returns the process-wide MemoryBudget, creating it on first use.
+    """
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = MemoryBudget(get_engine_config("results")["global_memory_bytes"])
+    return _budget
+
+
+def _cleanup(budget, reserved, mm, file):
+    # Runs on close() or when the buffer is garbage collected
+    budget.release(reserved)
+    if mm is not None:
+        mm.close()
+    if file is not None:
+        file.close()
+
+
+class ResultBuffer:
+    """
+    Read-only sequence of result rows, partly in memory and partly on disk.
+    Call close() (or use it as a context manager) to free the budget and the
+    spill file as soon as the rows are no longer needed.
+    """
+    def __init__(self, request_budget=None, budget=None, directory=None):
+        config = get_engine_config("results")
+        self.request_budget = (
+            config["request_memory_bytes"] if request_budget is None else request_budget
+        )
+        self.directory = directory or config["spill_directory"]
+        self.budget = budget or get_memory_budget()
+        self.rows = []
+        # Cursor description (name, type_code, ...) per column, when known
+        self.description = None
+        self.memory_bytes = 0
+        self.spilled_rows = 0
+        self.spilled_bytes = 0
+        self._file = None
+        self._offsets = array("Q")
+        self._mm = None
+        self._finalizer = None
+
+    def extend(self, batch):
+        """Adds a batch of rows, spilling it if it doesn't fit in memory."""
+        if not batch:
+            return
+        if self._file is None:
+            # One pickle per batch keeps the size estimate cheap
+            size = len(pickle.dumps(batch, pickle.HIGHEST_PROTOCOL))
+            if (self.memory_bytes + size <= self.request_budget
+                    and self.budget.reserve(size)):
+                self.rows.extend(batch)
+                self.memory_bytes += size
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = tempfile.TemporaryFile(dir=self.directory)
+        written = 0
+        for row in batch:
+            data = pickle.dumps(row, pickle.HIGHEST_PROTOCOL)
+            self._offsets.append(self.spilled_bytes + written)
+            self._file.write(_LENGTH.pack(len(data)))
+            self._file.write(data)
+            written += _LENGTH.size + len(data)
+        self.budget.record_spill(written, new_result=self.spilled_bytes == 0)
+        self.spilled_rows += len(batch)
+        self.spilled_bytes += written
+
+    def finish(self):
+        """Seals the buffer; spilled rows become readable through mmap."""
+        if self._file is not None and self.spilled_bytes:
+            self._file.flush()
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._finalizer = weakref.finalize(
+            self, _cleanup, self.budget, self.memory_bytes, self._mm, self._file
+        )
+        return self
+
+    @property
+    def spilled(self):
+        return self.spilled_rows > 0
+
+    def _spilled_row(self, index):
+        offset = self._offsets[index]
+        (length,) = _LENGTH.unpack_from(self._mm, offset)
+        start = offset + _LENGTH.size
+        return pickle.loads(self._mm[start:start + length])
+
+    def __len__(self):
+        return len(self.rows) + self.spilled_rows
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("result row index out of range")
+        if index < len(self.rows):
+            return self.rows[index]
+        return self._spilled_row(index - len(self.rows))
+
+    def __iter__(self):
+        yield from self.rows
+        for i in range(self.spilled_rows):
+            yield self._spilled_row(i)
+
+    def close(self):
+        self.rows = []
+        self.spilled_rows = 0
+        if self._finalizer is not None:
+            self._finalizer()
+        else:
+            # Closed before finish() (the fetch failed): nothing else frees these
+            _cleanup(self.budget, self.memory_bytes, None, self._file)
+            self.memory_bytes = 0
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,254 @@
+# pooler_engine/capture.py
+
+"""
+Query capture and replay
+Writes every pooled statement (arrival offset, session, latency, SQL, params)
+to a compact append-only binary log with size-based rotation, and replays a
+captured trace against a pool at recorded, scaled or maximum speed.
+
+File layout:
+    header  b"PCSTRC1\\n" + file start (epoch seconds, float64)
+    'S'     statement definition: id (u32), length (u32), UTF-8 SQL
+    'Q'     query event: arrival offset s (f64), session (u32), latency ms (f64),
+            flags (u8), statement id (u32), params length (u32), JSON params
+Arrival offsets are relative to the start of the capture, not of the file.
+Latency runs from arrival to completion, queueing included, which is also how
+the replay measures it.
+Each file carries its own statement table, so rotated files read independently.
+"""
+
+import glob
+import json
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+from .executor import ExecutorRejected, get_executor
+from .metrics import LatencyHistogram, MetricsRecorder
+
+MAGIC = b"PCSTRC1\n"
+_HEADER = struct.Struct("<d")
+_STATEMENT = struct.Struct("<II")
+_QUERY = struct.Struct("<dIdBII")
+FLAG_ERROR = 1
+
+TRACE_NAME = re.compile(r"^[\w-]+$")
+
+
+class CaptureWriter:
+    """
+    Append-only, rotating binary capture log for one trace.
+    Files are created exclusively; if `name` is already taken (two captures
+    started in the same second) a numeric suffix is added, see `self.name`.
+    """
+    def __init__(self, directory, name, max_bytes, max_files):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.started = time.monotonic()
+        self.events = 0
+        self._sequence = 0
+        self._file = None
+        self._statements = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        attempt = 1
+        while True:
+            try:
+                self._open_next()
+                break
+            except FileExistsError:
+                attempt += 1
+                self.name = f"{name}-{attempt}"
+
+    def _path(self, sequence):
+        return os.path.join(self.directory, f"{self.name}.{sequence:05d}.pct")
+
+    def _open_next(self):
+        sequence = self._sequence + 1
+        opened = open(self._path(sequence), "xb")
+        if self._file is not None:
+            self._file.close()
+        self._sequence, self._file = sequence, opened
+        self._file.write(MAGIC + _HEADER.pack(time.time()))
+        self._statements = {}
+        expired = self._sequence - self.max_files
+        if expired > 0 and os.path.exists(self._path(expired)):
+            os.remove(self._path(expired))
+
+    def record(self, arrived_at, session_id, duration_ms, query, params=None, error=False):
+        payload = json.dumps(params, default=str).encode() if params is not None else b""
+        with self._lock:
+            if self._file is None:
+                return
+            if self._file.tell() >= self.max_bytes:
+                self._open_next()
+            statement_id = self._statements.get(query)
+            if statement_id is None:
+                statement_id = self._statements[query] = len(self._statements)
+                sql = query.encode()
+                self._file.write(b"S" + _STATEMENT.pack(statement_id, len(sql)) + sql)
+            self._file.write(b"Q" + _QUERY.pack(
+                max(0.0, arrived_at - self.started), session_id & 0xFFFFFFFF,
+                duration_ms, FLAG_ERROR if error else 0, statement_id, len(payload),
+            ) + payload)
+            self.events += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def trace_files(directory, name):
+    return sorted(glob.glob(os.path.join(directory, f"{glob.escape(name)}.*.pct")))
+
+
+def list_traces(directory, prefix):
+    names = {
+        os.path.basename(path).split(".")[0]
+        for path in glob.glob(os.path.join(directory, f"{glob.escape(prefix)}*.pct"))
+    }
+    return sorted(names)
+
+
+def read_events(paths):
+    """
+    Returns every query event across the trace files, ordered by arrival.
+    Each event is (arrival_s, session_id, duration_ms, error, sql, params).
+    """
+    events = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not a capture file")
+        # Offsets already count from the capture start, so the header is skipped
+        offset = len(MAGIC) + _HEADER.size
+        statements = {}
+        while offset < len(data):
+            kind = data[offset:offset + 1]
+            offset += 1
+            if kind == b"S":
+                statement_id, length = _STATEMENT.unpack_from(data, offset)
+                offset += _STATEMENT.size
+                statements[statement_id] = data[offset:offset + length].decode()
+                offset += length
+            elif kind == b"Q":
+                arrival, session, duration, flags, statement_id, length = _QUERY.unpack_from(data, offset)
+                offset += _QUERY.size
+                params = json.loads(data[offset:offset + length]) if length else None
+                offset += length
+                events.append((
+                    arrival, session, duration, bool(flags & FLAG_ERROR),
+                    statements[statement_id], params,
+                ))
+            else:
+                # Truncated tail of a file still being written
+                break
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+class TraceReplayer:
+    """
+    Reissues captured events against a pool. Sessions run concurrently,
+    statements within a session keep their original order.
+    `speed` scales the recorded gaps (1 = real time); None replays at max speed.
+    The calling thread does the waiting and hands each statement to the shared
+    executor when it is due, so no worker is held idle between statements.
+    """
+    def __init__(self, pooler, events, speed=1.0, caller=None):
+        self.pooler = pooler
+        self.events = events
+        self.speed = speed
+        self.caller = caller
+        self.metrics = MetricsRecorder()
+        self.replay_histogram = LatencyHistogram()
+        self.failed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _run_event(self, event, submitted_at):
+        _, _, _, _, query, params = event
+        outcome = self.pooler.execute_one(query, params, self.metrics)
+        # From hand-off, like the recorded latency, so executor queueing counts on both sides
+        elapsed_ms = (time.monotonic() - submitted_at) * 1000
+        with self._lock:
+            if outcome is None:
+                self.replay_histogram.record(elapsed_ms)
+            else:
+                self.failed += 1
+
+    def run(self):
+        original = LatencyHistogram()
+        for event in self.events:
+            if not event[3]:
+                original.record(event[2])
+
+        executor = get_executor()
+        # Sessions with a statement in flight, and their statements due meanwhile
+        waiting = defaultdict(deque)
+        in_flight = set()
+        finished = queue.Queue()
+
+        def submit(session):
+            while waiting[session]:
+                event = waiting[session].popleft()
+                try:
+                    future = executor.submit(self.caller, self._run_event, event, time.monotonic())
+                except ExecutorRejected:
+                    with self._lock:
+                        self.failed += 1
+                        self.rejected += 1
+                    continue
+                in_flight.add(session)
+                future.add_done_callback(lambda _: finished.put(session))
+                return
+
+        started = time.monotonic()
+        pending = iter(self.events)
+        event = next(pending, None)
+        while event is not None or in_flight:
+            if event is not None:
+                due = started + event[0] / self.speed if self.speed else started
+                delay = due - time.monotonic()
+                if delay <= 0:
+                    session = event[1]
+                    waiting[session].append(event)
+                    if session not in in_flight:
+                        submit(session)
+                    event = next(pending, None)
+                    continue
+            else:
+                delay = None
+            try:
+                session = finished.get(timeout=delay)
+            except queue.Empty:
+                continue
+            in_flight.discard(session)
+            submit(session)
+        wall_time = time.monotonic() - started
+
+        original_summary = original.summary()
+        replay_summary = self.replay_histogram.summary()
+        return {
+            "statements": len(self.events),
+            "sessions": len({event[1] for event in self.events}),
+            "speed": self.speed or "max",
+            "wall_time_s": round(wall_time, 3),
+            "recorded_span_s": round(self.events[-1][0], 3) if self.events else 0,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "original_latency_ms": original_summary,
+            "replay_latency_ms": replay_summary,
+            "latency_delta_ms": {
+                key: round(replay_summary[key] - original_summary[key], 3)
+                for key in ("mean", "p50", "p95", "p99")
+            },
+        }
@@ -0,0 +1,175 @@
+# pooler_engine/columnar.py
+
+"""
+Columnar result encoding
+Turns result rows into one typed array per column, using the cursor's type
+codes, either as columnar JSON or as a length-prefixed binary layout:
+
+    b"PCC1" | u32 rows | u16 columns | u8 flags (bit 0: truncated at max_rows)
+    per column:  u16 name length | name (utf-8) | u8 kind
+    per column:  u32 section length | null bitmap (ceil(rows / 8) bytes) | values
+        int64 / float64: rows * 8 bytes (0 for nulls)
+        int32:           rows * 4 bytes
+        date:            rows * 4 bytes, days since 1970-01-01
+        timestamp:       rows * 8 bytes, microseconds since 1970-01-01 (UTC if zoned)
+        bool:            rows bytes
+        text:            u32 offsets (rows + 1) | utf-8 data
+
+All integers are little-endian.
+"""
+
+import struct
+from array import array
+from datetime import date, datetime, time, timedelta, timezone
+
+MAGIC = b"PCC1"
+FLAG_TRUNCATED = 1
+
+INT64, FLOAT64, BOOL, TEXT, INT32, DATE, TIMESTAMP = range(7)
+KIND_NAMES = {
+    INT64: "int64", FLOAT64: "float64", BOOL: "bool", TEXT: "text",
+    INT32: "int32", DATE: "date", TIMESTAMP: "timestamp",
+}
+_TYPECODES = {INT64: "q", FLOAT64: "d", INT32: "i", DATE: "i", TIMESTAMP: "q"}
+
+# PostgreSQL type OIDs with a native array kind; everything else is text
+_KIND_BY_OID = {
+    16: BOOL,
+    20: INT64, 26: INT64,
+    21: INT32, 23: INT32,
+    700: FLOAT64, 701: FLOAT64,
+    1082: DATE,
+    1114: TIMESTAMP, 1184: TIMESTAMP,
+}
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _as_text(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+class _Column:
+    __slots__ = ("name", "kind", "nulls", "values")
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.nulls = bytearray()
+        if kind in _TYPECODES:
+            self.values = array(_TYPECODES[kind])
+        elif kind == BOOL:
+            self.values = bytearray()
+        else:
+            self.values = []
+
+    def append(self, index, value):
+        if index % 8 == 0:
+            self.nulls.append(0)
+        if value is None:
+            self.nulls[index // 8] |= 1 << (index % 8)
+            value = "" if self.kind == TEXT else 0
+        elif self.kind == DATE:
+            value = value.toordinal() - _EPOCH_ORDINAL
+        elif self.kind == TIMESTAMP:
+            delta = value - (_EPOCH_UTC if value.tzinfo else _EPOCH)
+            value = delta // timedelta(microseconds=1)
+        if self.kind == TEXT:
+            self.values.append(_as_text(value))
+        else:
+            self.values.append(value)
+
+    def json_values(self):
+        values = self.values
+        if self.kind == BOOL:
+            values = [bool(v) for v in values]
+        elif self.kind == DATE:
+            values = [date.fromordinal(v + _EPOCH_ORDINAL).isoformat() for v in values]
+        elif self.kind == TIMESTAMP:
+            values = [(_EPOCH + timedelta(microseconds=v)).isoformat() for v in values]
+        elif self.kind != TEXT:
+            values = values.tolist()
+        if any(self.nulls):
+            values = [
+                None if self.nulls[i // 8] >> (i % 8) & 1 else v
+                for i, v in enumerate(values)
+            ]
+        return values
+
+    def section(self):
+        if self.kind == TEXT:
+            encoded = [v.encode() for v in self.values]
+            offsets = array("I", [0])
+            total = 0
+            for item in encoded:
+                total += len(item)
+                offsets.append(total)
+            body = _little_endian(offsets) + b"".join(encoded)
+        elif self.kind == BOOL:
+            body = bytes(self.values)
+        else:
+            body = _little_endian(self.values)
+        payload = bytes(self.nulls) + body
+        return struct.pack("<I", len(payload)) + payload
+
+
+def _little_endian(values):
+    if struct.pack("=H", 1) != struct.pack("<H", 1):
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class ColumnarResult:
+    """
+    Column-major copy of a result, filled batch by batch from row tuples.
+    """
+    def __init__(self, description):
+        self.columns = [
+            _Column(col[0], _KIND_BY_OID.get(col[1], TEXT)) for col in description or ()
+        ]
+        self.row_count = 0
+        self.truncated = False
+
+    @classmethod
+    def from_rows(cls, description, rows, max_rows=None):
+        result = cls(description)
+        for row in rows:
+            if max_rows is not None and result.row_count >= max_rows:
+                result.truncated = True
+                break
+            result.add_row(row)
+        return result
+
+    def add_row(self, row):
+        index = self.row_count
+        for column, value in zip(self.columns, row):
+            column.append(index, value)
+        self.row_count += 1
+
+    def schema(self):
+        return [{"name": c.name, "type": KIND_NAMES[c.kind]} for c in self.columns]
+
+    def to_json(self):
+        return {
+            "columns": self.schema(),
+            "row_count": self.row_count,
+            "truncated": self.truncated,
+            "values": [c.json_values() for c in self.columns],
+        }
+
+    def to_bytes(self):
+        flags = FLAG_TRUNCATED if self.truncated else 0
+        parts = [MAGIC, struct.pack("<IHB", self.row_count, len(self.columns), flags)]
+        for column in self.columns:
+            name = column.name.encode()
+            parts.append(struct.pack("<H", len(name)) + name + struct.pack("<B", column.kind))
+        for column in self.columns:
+            parts.append(column.section())
+        return b"".join(parts)
@@ -2,15 +2,102 @@
 
 """
 Pooler configuration helper
-Loads pool size, queue size, and timeout for a user database.
+Loads pool size, queue size, and timeout for a user database,
+and the process-wide engine settings.
 """
 
+import os
+import tempfile
+
 DEFAULT_POOL_CONFIG = {
     "pool_size": 10,
     "queue_size": 20,
     "queue_timeout_ms": 5000,
 }
 
+# Engine-wide defaults, overridable through settings.POOLER_ENGINE
+DEFAULT_ENGINE_CONFIG = {
+    "executor": {
+        "max_workers": 100,
+        "max_pending": 5000,
+        "max_pending_per_caller": 1000,
+        "submit_timeout_s": 30,
+    },
+    "deadline": {
+        # Server-side budget for a statement once it has a connection
+        "statement_timeout_ms": 10000,
+        # Extra time a caller waits past the deadline before cancelling
+        "cancel_grace_ms": 1000,
+    },
+    "tracing": {
+        # Upper bound on raw traces kept per run when sampling is on
+        "max_sampled_traces": 1000,
+    },
+    "governor": {
+        # Keep below the server's max_connections, leaving room for admin sessions
+        "max_connections_per_host": 90,
+        "max_connections_per_user": 50,
+        "max_requests_per_host": 2000,
+        "max_requests_per_user": 1000,
+    },
+    "statements": {
+        # Distinct fingerprints tracked per database
+        "max_entries": 500,
+    },
+    "capture": {
+        "directory": os.path.join(tempfile.gettempdir(), "pcsaver-captures"),
+        # Rotate after this many bytes, keeping the newest `max_files` files
+        "max_bytes": 64 * 1024 * 1024,
+        "max_files": 8,
+    },
+    "admission": {
+        # CoDel: shed early once the minimum queue wait over an interval
+        # stays above the target
+        "enabled": True,
+        "target_ms": 100,
+        "interval_ms": 1000,
+    },
+    "coalescing": {
+        # Identical concurrent reads on one pool share a single execution
+        "enabled": True,
+    },
+    "hedging": {
+        # Opt-in: duplicate reads still running past the latency percentile
+        "enabled": False,
+        "percentile": 95,
+        # Duplicates allowed, as a percentage of reads
+        "budget_percent": 5,
+        # Reads observed before the percentile is trusted
+        "min_samples": 100,
+        "max_threads": 16,
+    },
+    "results": {
+        # Rows buffered in memory per request before spilling to disk
+        "request_memory_bytes": 16 * 1024 * 1024,
+        # Rows buffered in memory across all in-flight requests
+        "global_memory_bytes": 256 * 1024 * 1024,
+        "fetch_batch_rows": 1000,
+        "spill_directory": os.path.join(tempfile.gettempdir(), "pcsaver-spill"),
+    },
+    "leaks": {
+        # A borrow held longer than this is reported as a leak
+        "threshold_ms": 30000,
+        # Cancel and close leaked connections, freeing their pool slot
+        "reclaim": False,
+        # Record the borrower's stack (costs a traceback per borrow)
+        "capture_stack": False,
+        "scan_interval_ms": 1000,
+    },
+    "idle": {
+        # Pooled connections unused for this long are closed (0 keeps them open)
+        "timeout_ms": 300000,
+    },
+    "profiler": {
+        "interval_ms": 10,
+        "top_n": 20,
+    },
+}
+
 def get_pool_config(user_db):
     """
     Returns pool configuration for a given user database.
@@ -25,3 +112,15 @@ def get_pool_config(user_db):
         }
     except Exception:
         return DEFAULT_POOL_CONFIG
+
+def get_engine_config(section):
+    """
+    Returns one section of the engine settings.
+    Values from settings.POOLER_ENGINE override the defaults key by key.
+    """
+    from django.conf import settings
+
+    config = dict(DEFAULT_ENGINE_CONFIG[section])
+    overrides = getattr(settings, "POOLER_ENGINE", {}).get(section, {})
+    config.update(overrides)
+    return config
@@ -0,0 +1,73 @@
+# pooler_engine/context.py
+
+"""
+Per-request execution context
+Carries the end-to-end deadline of a request and the connection it has
+borrowed, so a caller that gives up can cancel the query on the server.
+"""
+
+import threading
+import time
+from .tracing import RequestTrace
+
+
+class Deadline:
+    """
+    Monotonic point in time by which a request must complete.
+    """
+    def __init__(self, timeout_seconds):
+        self.expires_at = time.monotonic() + timeout_seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def remaining_ms(self):
+        return int(self.remaining() * 1000)
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+
+class RequestContext:
+    """
+    State shared between the worker running a request and the caller waiting on it.
+    """
+    def __init__(self, deadline, metrics, request_id=None, keep_result=False,
+                 read_only=False, row_limit=None):
+        self.deadline = deadline
+        self.arrived_at = time.monotonic()
+        self.metrics = metrics
+        self.trace = RequestTrace(request_id)
+        self.cancelled = False
+        # When set, the worker hands the ResultBuffer back instead of closing it
+        self.keep_result = keep_result
+        self.result = None
+        # Run the statement in a READ ONLY transaction / stop fetching after row_limit rows
+        self.read_only = read_only
+        self.row_limit = row_limit
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def attach(self, connection):
+        """Marks `connection` as running this request's statement."""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._connection = connection
+            return True
+
+    def detach(self):
+        with self._lock:
+            self._connection = None
+
+    def cancel(self):
+        """
+        Abandons the request. A statement already running is cancelled server-side.
+        """
+        with self._lock:
+            self.cancelled = True
+            if self._connection is not None:
+                try:
+                    self._connection.cancel()
+                except Exception as e:
+                    print(f"Cancel error: {e}")
@@ -1,27 +1,141 @@
+import uuid
 import psycopg2
+from psycopg2 import extensions
+from .buffering import ResultBuffer
+from .config import get_engine_config
+from .context import Deadline
+from .fingerprint import fingerprint
+from .governor import get_governor
 
-def execute_db_query(user_db, query):
+def open_connection(user_db):
+    return psycopg2.connect(
+        host=user_db.host,
+        port=user_db.port,
+        user=user_db.username,
+        password=user_db.password,
+        dbname=user_db.dbname,
+    )
+
+def is_reusable(conn):
+    """
+    A connection can go back to the pool only if it is open and idle,
+    i.e. no transaction was left behind by the last statement.
+    """
+    return (
+        not conn.closed
+        and conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+    )
+
+def _fetch_buffered(cur, batch_rows, row_limit=None):
+    """
+    Drains the cursor in batches into a ResultBuffer, so rows past the
+    memory budget go to disk instead of the heap.
+    With `row_limit`, fetching stops once that many rows were buffered.
+    """
+    result = ResultBuffer()
     try:
-        conn = psycopg2.connect(
-            host=user_db.host,
-            port=user_db.port,
-            user=user_db.username,
-            password=user_db.password,
-            dbname=user_db.dbname,
-        )
-        cur = conn.cursor()
-        cur.execute(query)
-        try:
-            result = cur.fetchall()
-        except psycopg2.ProgrammingError:
+        while True:
+            size = batch_rows if row_limit is None else min(batch_rows, row_limit - len(result))
+            if size <= 0:
+                break
+            batch = cur.fetchmany(size)
+            result.extend(batch)
+            # A short batch is the last one; don't pay a FETCH round trip to learn that
+            if len(batch) < size:
+                break
+    except BaseException:
+        result.close()
+        raise
+    # Named cursors only describe their columns once rows were fetched
+    result.description = cur.description
+    return result.finish()
+
+def run_query(conn, query, params=None, statement_timeout_ms=None, trace=None,
+              read_only=False, row_limit=None):
+    """
+    Runs a query on an open connection in its own transaction.
+    `statement_timeout_ms` is applied with SET LOCAL, so it never outlives the query.
+    When a RequestTrace is given, the execute/fetch/release phases are marked on it.
+    Rows come back as a ResultBuffer (bounded in memory, spilling to disk);
+    plain reads stream through a server-side cursor so libpq never holds the
+    whole set; anything DECLARE CURSOR rejects (data-modifying CTEs, SELECT INTO,
+    several statements) uses the client cursor, still drained in batches.
+    `read_only` makes the server reject any write; `row_limit` caps the rows fetched.
+    """
+    batch_rows = get_engine_config("results")["fetch_batch_rows"]
+    cur = conn.cursor()
+    stream = None
+    try:
+        if trace:
+            trace.enter("execute")
+        if read_only:
+            # Must come first in the transaction; also stops writes from functions
+            cur.execute("SET TRANSACTION READ ONLY")
+        if statement_timeout_ms is not None:
+            cur.execute("SET LOCAL statement_timeout = %s", (max(1, int(statement_timeout_ms)),))
+        if fingerprint(query).is_plain_read:
+            stream = conn.cursor(name=f"pooler_{uuid.uuid4().hex}")
+            stream.itersize = batch_rows
+            stream.execute(query, params)
+            if trace:
+                trace.enter("fetch")
+            result = _fetch_buffered(stream, batch_rows, row_limit)
+        else:
+            cur.execute(query, params)
+            if trace:
+                trace.enter("fetch")
             # No results to fetch (INSERT/UPDATE/DELETE)
-            result = None
-            conn.commit()
-        conn.close()
+            result = _fetch_buffered(cur, batch_rows, row_limit) if cur.description else None
+        if trace:
+            trace.enter("release")
+        if stream is not None:
+            stream.close()
+            stream = None
+        conn.commit()
         return result
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+        raise
+    finally:
+        if stream is not None and not conn.closed:
+            try:
+                stream.close()
+            except psycopg2.Error:
+                pass
+        cur.close()
+
+def execute_db_query(user_db, query, params=None, ctx=None):
+    """
+    Runs a query on a fresh, unpooled connection. The connection still takes a
+    governor permit, waiting for one until the deadline (default: the statement
+    timeout); BudgetExhausted is raised if none frees up in time.
+    With a RequestContext the statement gets only what is left of its deadline
+    and can be cancelled by the caller, as in the pool.
+    """
+    governor = get_governor()
+    deadline = ctx.deadline if ctx is not None else Deadline(
+        get_engine_config("deadline")["statement_timeout_ms"] / 1000
+    )
+    governor.acquire_direct_connection(user_db, deadline)
+    conn = None
+    try:
+        conn = open_connection(user_db)
+        if ctx is None:
+            return run_query(conn, query, params)
+        if not ctx.attach(conn):
+            raise extensions.QueryCanceledError("canceling statement due to user request")
+        try:
+            return run_query(conn, query, params, statement_timeout_ms=deadline.remaining_ms())
+        finally:
+            ctx.detach()
     except Exception as e:
         print(f"Database error: {e}")
         raise  # Re-raise to handle in pooler
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
+        governor.release_direct_connection(user_db)
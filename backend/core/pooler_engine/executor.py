@@ -0,0 +1,158 @@
+# pooler_engine/executor.py
+
+"""
+Shared executor service
+One process-wide worker pool with a fixed thread budget, bounded submission
+queues and per-caller usage accounting.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .config import get_engine_config
+
+
+class ExecutorRejected(Exception):
+    """
+    Raised when a submission cannot be admitted within the executor limits.
+    """
+
+
+class CallerUsage:
+    """
+    Running totals for a single caller of the executor.
+    """
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.pending = 0
+        self.running = 0
+        self.busy_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "pending": self.pending,
+            "running": self.running,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+
+class ExecutorService:
+    """
+    Wraps a ThreadPoolExecutor with backpressure.
+    A submission waits up to `submit_timeout_s` for room in both the global
+    queue and the caller's own queue, and is rejected after that.
+    """
+    def __init__(self, max_workers, max_pending, max_pending_per_caller, submit_timeout_s):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_pending_per_caller = max_pending_per_caller
+        self.submit_timeout = submit_timeout_s
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pooler-worker"
+        )
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)
+        self._pending = 0
+        self._callers = {}
+
+    def _usage_for(self, caller):
+        usage = self._callers.get(caller)
+        if usage is None:
+            usage = self._callers[caller] = CallerUsage()
+        return usage
+
+    def _has_room(self, usage):
+        return (
+            self._pending < self.max_pending
+            and usage.pending < self.max_pending_per_caller
+        )
+
+    def submit(self, caller, fn, *args, block=True, **kwargs):
+        """
+        Queue `fn(*args, **kwargs)` on behalf of `caller` and return its future.
+        Raises ExecutorRejected when the limits stay exhausted.
+        """
+        deadline = time.monotonic() + (self.submit_timeout if block else 0)
+
+        with self._room:
+            usage = self._usage_for(caller)
+            while not self._has_room(usage):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    usage.rejected += 1
+                    raise ExecutorRejected(
+                        f"executor busy ({self._pending}/{self.max_pending} pending, "
+                        f"{usage.pending}/{self.max_pending_per_caller} for caller)"
+                    )
+                self._room.wait(remaining)
+
+            self._pending += 1
+            usage.pending += 1
+            usage.submitted += 1
+
+        def run():
+            with self._lock:
+                usage.running += 1
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    usage.running -= 1
+                    usage.busy_seconds += elapsed
+
+        try:
+            future = self._executor.submit(run)
+        except RuntimeError:
+            self._release(usage, completed=False)
+            raise ExecutorRejected("executor is shut down")
+
+        future.add_done_callback(lambda _: self._release(usage))
+        return future
+
+    def _release(self, usage, completed=True):
+        with self._room:
+            self._pending -= 1
+            usage.pending -= 1
+            if completed:
+                usage.completed += 1
+            self._room.notify_all()
+
+    def usage(self, caller=None):
+        """
+        Returns accounting for one caller, or for the whole executor.
+        """
+        with self._lock:
+            if caller is not None:
+                return self._usage_for(caller).as_dict()
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "callers": {
+                    str(name): usage.as_dict() for name, usage in self._callers.items()
+                },
+            }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the process-wide ExecutorService, creating it on first use.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ExecutorService(**get_engine_config("executor"))
+    return _executor
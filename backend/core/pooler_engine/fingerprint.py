@@ -0,0 +1,187 @@
+# pooler_engine/fingerprint.py
+
+"""
+Query fingerprinting and per-statement statistics
+Normalises statements into fingerprints (literals replaced, whitespace and
+comments stripped) and keeps pg_stat_statements-style counters per fingerprint.
+"""
+
+import hashlib
+import heapq
+import itertools
+import re
+import threading
+from functools import lru_cache
+import sqlparse
+from sqlparse import tokens as T
+from .metrics import LatencyHistogram
+
+FINGERPRINT_CACHE_SIZE = 4096
+
+_LIST_OF_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE_BEFORE = re.compile(r"\s+([,)])")
+_SPACE_AFTER = re.compile(r"\(\s+")
+
+
+class Fingerprint:
+    __slots__ = ("id", "text", "statement_type", "statement_count", "modifies")
+
+    def __init__(self, fingerprint_id, text, statement_type, statement_count=1, modifies=False):
+        self.id = fingerprint_id
+        self.text = text
+        # Type of the first statement only; see statement_count
+        self.statement_type = statement_type
+        self.statement_count = statement_count
+        # The first statement writes despite its type: a data-modifying CTE or SELECT INTO
+        self.modifies = modifies
+
+    @property
+    def is_read(self):
+        return self.statement_type == "SELECT"
+
+    @property
+    def is_plain_read(self):
+        """A lone SELECT that writes nothing, so it can run inside DECLARE CURSOR."""
+        return self.is_read and self.statement_count == 1 and not self.modifies
+
+    @property
+    def is_single_read(self):
+        """A lone SELECT: no later statement can hide behind the first one's type."""
+        return self.is_read and self.statement_count == 1
+
+
+@lru_cache(maxsize=FINGERPRINT_CACHE_SIZE)
+def fingerprint(query):
+    """
+    Returns the cached Fingerprint of a query.
+    `SELECT * FROM t WHERE id IN (1, 2)` and `select * from t where id in (7)`
+    share the fingerprint `SELECT * FROM t WHERE id IN (?)`.
+    """
+    statements = [s for s in sqlparse.parse(query) if s.value.strip()]
+    statement = statements[0] if statements else None
+    parts = []
+    modifies = False
+    for token in (statement.flatten() if statement else ()):
+        ttype = token.ttype
+        if ttype in T.Whitespace or ttype in T.Comment or ttype in T.Newline:
+            continue
+        if (ttype in T.Keyword.DML and token.normalized != "SELECT") or (
+            ttype in T.Keyword and token.normalized == "INTO"
+        ):
+            modifies = True
+        if ttype in T.Literal or ttype in T.Name.Placeholder:
+            parts.append("?")
+        elif ttype in T.Keyword:
+            parts.append(token.normalized.upper())
+        else:
+            parts.append(token.value)
+
+    text = " ".join(parts).rstrip(" ;")
+    text = _LIST_OF_PLACEHOLDERS.sub("?", text)
+    text = _SPACE_AFTER.sub("(", _SPACE_BEFORE.sub(r"\1", text))
+    fingerprint_id = hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+    statement_type = statement.get_type() if statement else "UNKNOWN"
+    return Fingerprint(fingerprint_id, text, statement_type, len(statements), modifies)
+
+
+class StatementEntry:
+    """
+    Counters for one fingerprint. `error_ms` is the total time inherited from
+    the entry it replaced: the most this fingerprint's time may be undercounted.
+    """
+    def __init__(self, fp, error_ms=0.0):
+        self.fingerprint = fp
+        self.calls = 0
+        self.rows = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.error_ms = error_ms
+        self.histogram = LatencyHistogram()
+
+    @property
+    def weight(self):
+        return self.total_ms + self.error_ms
+
+    def as_dict(self):
+        latency = self.histogram.summary()
+        return {
+            "fingerprint": self.fingerprint.id,
+            "query": self.fingerprint.text,
+            "statement_type": self.fingerprint.statement_type,
+            "calls": self.calls,
+            "rows": self.rows,
+            "errors": self.errors,
+            "total_time_ms": round(self.total_ms, 3),
+            "total_time_error_ms": round(self.error_ms, 3),
+            "mean_time_ms": latency["mean"],
+            "p95_time_ms": latency["p95"],
+            "p99_time_ms": latency["p99"],
+            "max_time_ms": latency["max"],
+        }
+
+
+class StatementStats:
+    """
+    Bounded per-fingerprint statistics for one database.
+    When full, the entry with the least total time is evicted to make room,
+    so the statements that consume the most pool time are always retained.
+    Eviction follows Space-Saving: the newcomer inherits the victim's total as
+    its error bound, so it is not simply the next one out. A lazy min-heap
+    finds the victim without scanning every entry.
+    """
+    ORDERINGS = {
+        "total_time": lambda e: e.total_ms,
+        "calls": lambda e: e.calls,
+        "mean_time": lambda e: e.total_ms / e.calls if e.calls else 0,
+        "rows": lambda e: e.rows,
+        "errors": lambda e: e.errors,
+    }
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.evicted = 0
+        # One (weight when pushed, seq, fingerprint id) per entry; weights only grow
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        # Called with self._lock held; returns the victim's weight
+        while True:
+            weight, _, fp_id = heapq.heappop(self._heap)
+            entry = self.entries[fp_id]
+            if entry.weight > weight:
+                # Grown since it was pushed: re-file it under its current weight
+                heapq.heappush(self._heap, (entry.weight, next(self._seq), fp_id))
+                continue
+            del self.entries[fp_id]
+            self.evicted += 1
+            return weight
+
+    def record(self, query, duration_ms, rows=0, error=False):
+        fp = fingerprint(query)
+        with self._lock:
+            entry = self.entries.get(fp.id)
+            if entry is None:
+                error_ms = self._evict() if len(self.entries) >= self.max_entries else 0.0
+                entry = self.entries[fp.id] = StatementEntry(fp, error_ms)
+                heapq.heappush(self._heap, (entry.weight, next(self._seq), fp.id))
+            entry.calls += 1
+            entry.rows += rows
+            entry.total_ms += duration_ms
+            entry.histogram.record(duration_ms)
+            if error:
+                entry.errors += 1
+
+    def top(self, limit=20, order_by="total_time"):
+        key = self.ORDERINGS.get(order_by, self.ORDERINGS["total_time"])
+        with self._lock:
+            entries = sorted(self.entries.values(), key=key, reverse=True)[:limit]
+            return [entry.as_dict() for entry in entries]
+
+    def reset(self):
+        with self._lock:
+            self.entries = {}
+            self.evicted = 0
+            self._heap = []
@@ -0,0 +1,208 @@
+# pooler_engine/governor.py
+
+"""
+Global connection governor
+Caps physical connections and outstanding requests across every pool,
+per target host:port and per owning user. Waiters are served in FIFO order.
+"""
+
+import threading
+import weakref
+from collections import deque
+from .config import get_engine_config
+
+
+def budget_keys(user_db):
+    """(host key, owner key) under which connections to `user_db` are budgeted."""
+    return f"{user_db.host}:{user_db.port}", f"user:{getattr(user_db, 'user_id', None)}"
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised when a shared budget could not be obtained before the deadline.
+    """
+
+
+class FairSemaphore:
+    """
+    Counting semaphore that hands permits to waiters strictly in arrival order.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return True
+            return False
+
+    def acquire(self, timeout):
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return True
+            granted = threading.Event()
+            self._waiters.append(granted)
+
+        granted.wait(timeout)
+        with self._lock:
+            if granted.is_set():
+                return True
+            self._waiters.remove(granted)
+            return False
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+            # Hand freed permits straight to the oldest waiters
+            while self._waiters and self.in_use < self.limit:
+                self.in_use += 1
+                self._waiters.popleft().set()
+
+    def waiting(self):
+        with self._lock:
+            return len(self._waiters)
+
+
+class ConnectionGovernor:
+    """
+    Shared budgets keyed by target host and by owning user.
+    Physical connections take a permit from both; so does every outstanding request.
+    """
+    def __init__(self, max_connections_per_host, max_connections_per_user,
+                 max_requests_per_host, max_requests_per_user):
+        self.limits = {
+            "connections_per_host": max_connections_per_host,
+            "connections_per_user": max_connections_per_user,
+            "requests_per_host": max_requests_per_host,
+            "requests_per_user": max_requests_per_user,
+        }
+        self._budgets = {}
+        # Registered pools by host key and by owner key
+        self._pools = {}
+        self._owner_pools = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, kind, key):
+        with self._lock:
+            budget = self._budgets.get((kind, key))
+            if budget is None:
+                budget = self._budgets[(kind, key)] = FairSemaphore(self.limits[kind])
+            return budget
+
+    def register(self, pooler):
+        """Pools register so idle connections can be reclaimed for other pools."""
+        with self._lock:
+            self._pools.setdefault(pooler.host_key, weakref.WeakSet()).add(pooler)
+            self._owner_pools.setdefault(pooler.owner_key, weakref.WeakSet()).add(pooler)
+
+    def _reclaim_from(self, registry, key, requester):
+        with self._lock:
+            pools = list(registry.get(key, ()))
+        for pooler in pools:
+            if pooler is not requester and pooler.retire_idle_connection():
+                return
+
+    def _reclaim_idle(self, host_key, requester):
+        """Asks another pool on the same host to give back one idle connection."""
+        self._reclaim_from(self._pools, host_key, requester)
+
+    def _reclaim_idle_for_owner(self, owner_key, requester):
+        """Asks another pool of the same user, on any host, to give back one idle connection."""
+        self._reclaim_from(self._owner_pools, owner_key, requester)
+
+    def _acquire_pair(self, kind, host_key, user_key, deadline, on_wait=None, on_user_wait=None):
+        # The per-user budget is taken first, so a user waiting on a busy host
+        # only holds back their own requests
+        user_budget = self._budget(f"{kind}_per_user", user_key)
+        host_budget = self._budget(f"{kind}_per_host", host_key)
+
+        if not user_budget.try_acquire():
+            if on_user_wait is not None:
+                on_user_wait()
+            if not user_budget.acquire(deadline.remaining()):
+                raise BudgetExhausted(f"per-user {kind} budget exhausted")
+        if host_budget.try_acquire():
+            return
+        if on_wait is not None:
+            on_wait()
+        if not host_budget.acquire(deadline.remaining()):
+            user_budget.release()
+            raise BudgetExhausted(f"per-host {kind} budget exhausted")
+
+    def _release_pair(self, kind, host_key, user_key):
+        self._budget(f"{kind}_per_host", host_key).release()
+        self._budget(f"{kind}_per_user", user_key).release()
+
+    def acquire_connection(self, pooler, deadline):
+        self._acquire_pair(
+            "connections", pooler.host_key, pooler.owner_key, deadline,
+            on_wait=lambda: self._reclaim_idle(pooler.host_key, pooler),
+            on_user_wait=lambda: self._reclaim_idle_for_owner(pooler.owner_key, pooler),
+        )
+
+    def connection_contended(self, pooler):
+        """True when other requests are queued for a connection permit this pool holds."""
+        return (
+            self._budget("connections_per_host", pooler.host_key).waiting() > 0
+            or self._budget("connections_per_user", pooler.owner_key).waiting() > 0
+        )
+
+    def release_connection(self, pooler):
+        self._release_pair("connections", pooler.host_key, pooler.owner_key)
+
+    def acquire_direct_connection(self, user_db, deadline):
+        """
+        Permit for a physical connection opened outside any pool (direct runs,
+        monitoring sessions), so those count against the same limits.
+        """
+        host_key, owner_key = budget_keys(user_db)
+        self._acquire_pair(
+            "connections", host_key, owner_key, deadline,
+            on_wait=lambda: self._reclaim_idle(host_key, None),
+            on_user_wait=lambda: self._reclaim_idle_for_owner(owner_key, None),
+        )
+
+    def release_direct_connection(self, user_db):
+        self._release_pair("connections", *budget_keys(user_db))
+
+    def acquire_request(self, pooler, deadline):
+        self._acquire_pair("requests", pooler.host_key, pooler.owner_key, deadline)
+
+    def release_request(self, pooler):
+        self._release_pair("requests", pooler.host_key, pooler.owner_key)
+
+    def stats(self, host_key=None, user_key=None):
+        with self._lock:
+            budgets = list(self._budgets.items())
+        return {
+            f"{kind}:{key}": {
+                "in_use": budget.in_use,
+                "limit": budget.limit,
+                "waiting": budget.waiting(),
+            }
+            for (kind, key), budget in budgets
+            if (host_key is None and user_key is None)
+            or (kind.endswith("_per_host") and key == host_key)
+            or (kind.endswith("_per_user") and key == user_key)
+        }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """
+    Returns the process-wide ConnectionGovernor, creating it on first use.
+    """
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = ConnectionGovernor(**get_engine_config("governor"))
+    return _governor
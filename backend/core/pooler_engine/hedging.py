@@ -0,0 +1,198 @@
+# pooler_engine/hedging.py
+
+"""
+Hedged reads
+A read that is still running after the pool's current latency percentile
+gets a duplicate on another pooled connection. Whichever attempt succeeds
+first wins and the other is cancelled. A budget keeps duplicates to a small
+fraction of reads, so hedging can't amplify an overload.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .config import get_engine_config
+from .metrics import LatencyHistogram
+
+
+class HedgeRace:
+    """
+    Attempts racing to answer one request. The first success wins; a failure
+    only decides the race once no other attempt is left running.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.winner = None
+        self.outcome = None
+        self.hedged = False
+        self._attempts = []
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def join(self, ctx, hedge=False):
+        """Registers an attempt; returns False if the race is already decided."""
+        with self._lock:
+            if self.winner is not None:
+                return False
+            self._attempts.append(ctx)
+            self._running += 1
+            self.hedged = self.hedged or hedge
+            return True
+
+    def finish(self, ctx, outcome):
+        with self._lock:
+            self._running -= 1
+            if self.winner is not None or (outcome is not None and self._running):
+                return
+            self.winner = ctx
+            self.outcome = outcome
+            losers = [c for c in self._attempts if c is not ctx]
+        for loser in losers:
+            loser.cancel()
+        self.done.set()
+
+
+class AttemptMetrics:
+    """
+    Metrics seen by one attempt of a hedged request. Connection and wait
+    metrics go straight through; the request outcome is only counted once
+    the race is decided.
+    """
+    def __init__(self, metrics):
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._metrics, name)
+
+    def increment_success(self):
+        pass
+
+    def increment_failure(self):
+        pass
+
+    def increment_shed(self):
+        pass
+
+
+class Hedger:
+    """
+    Per-pool read latency histogram and hedge budget.
+    """
+    def __init__(self, percentile, budget_percent, min_samples, enabled=False):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget_percent = budget_percent
+        self.min_samples = min_samples
+        self.histogram = LatencyHistogram()
+        self.reads = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms):
+        with self._lock:
+            self.histogram.record(latency_ms)
+
+    def read_threshold(self):
+        """
+        Counts a read toward the budget and returns the seconds after which it
+        is hedged, or None while there are too few samples.
+        """
+        with self._lock:
+            self.reads += 1
+            if self.histogram.count < self.min_samples:
+                return None
+            return self.histogram.percentile(self.percentile) / 1000
+
+    def allow(self):
+        """Takes a hedge from the budget if one is left."""
+        with self._lock:
+            if self.hedges + 1 > self.reads * self.budget_percent / 100:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "percentile": self.percentile,
+                "threshold_ms": (
+                    round(self.histogram.percentile(self.percentile), 3)
+                    if self.histogram.count >= self.min_samples else None
+                ),
+                "budget_percent": self.budget_percent,
+                "reads": self.reads,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+
+
+class HedgeScheduler:
+    """
+    One timer thread for every pending hedge, plus a small pool that runs them.
+    """
+    def __init__(self, max_threads):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_threads, thread_name_prefix="pooler-hedge"
+        )
+        self._max_threads = max_threads
+        self._running = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        threading.Thread(target=self._run, name="pooler-hedger", daemon=True).start()
+
+    def schedule(self, delay, race, hedger, launch):
+        """Runs launch() after `delay` seconds unless the race is decided first."""
+        with self._condition:
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, next(self._seq), race, hedger, launch)
+            )
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                _, _, race, hedger, launch = heapq.heappop(self._heap)
+                # A saturated hedge pool would only start duplicates late
+                if race.done.is_set() or self._running >= self._max_threads:
+                    continue
+                if not hedger.allow():
+                    continue
+                self._running += 1
+            self._executor.submit(self._launch, launch)
+
+    def _launch(self, launch):
+        try:
+            launch()
+        except Exception as e:
+            print(f"Hedge error: {e}")
+        finally:
+            with self._condition:
+                self._running -= 1
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_hedge_scheduler():
+    """
+    Returns the process-wide HedgeScheduler, creating it on first use.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = HedgeScheduler(get_engine_config("hedging")["max_threads"])
+    return _scheduler
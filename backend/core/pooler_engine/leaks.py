@@ -0,0 +1,97 @@
+# pooler_engine/leaks.py
+
+"""
+Borrowed-connection tracking and leak detection
+Every physical connection carries its own bookkeeping, every borrow records
+when, where and by whom it was taken, and a background reaper flags (and
+optionally reclaims) connections held past the leak threshold. The same scan
+closes connections that sat idle past the idle timeout.
+"""
+
+import threading
+import time
+import traceback
+import weakref
+from .config import get_engine_config
+
+
+class ConnectionInfo:
+    """
+    Lifetime bookkeeping for one physical connection.
+    """
+    __slots__ = ("created_at", "use_count", "last_used_at", "backend_pid")
+
+    def __init__(self, backend_pid=None):
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.use_count = 0
+        self.backend_pid = backend_pid
+
+
+class BorrowRecord:
+    """
+    One outstanding borrow of a connection.
+    """
+    __slots__ = ("conn", "info", "borrowed_at", "thread_name", "stack", "statement", "leak_flagged")
+
+    def __init__(self, conn, info, statement=None, capture_stack=False):
+        self.conn = conn
+        self.info = info
+        self.borrowed_at = time.monotonic()
+        self.thread_name = threading.current_thread().name
+        # Drop the frames of the pool itself from the captured stack
+        self.stack = traceback.format_stack(limit=16)[:-3] if capture_stack else None
+        self.statement = statement
+        self.leak_flagged = False
+
+    def held_for(self, now=None):
+        return (now or time.monotonic()) - self.borrowed_at
+
+
+class LeakReaper:
+    """
+    Periodically asks every registered pool to check its borrows and close
+    connections idle for too long.
+    """
+    def __init__(self, scan_interval_ms):
+        self.interval = scan_interval_ms / 1000
+        self._pools = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, pooler):
+        with self._lock:
+            self._pools.add(pooler)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="pooler-reaper", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                pools = list(self._pools)
+            for pooler in pools:
+                try:
+                    pooler.check_leaks()
+                    pooler.close_idle()
+                except Exception as e:
+                    print(f"Leak check error: {e}")
+
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+
+def get_reaper():
+    """
+    Returns the process-wide LeakReaper, creating it on first use.
+    """
+    global _reaper
+    if _reaper is None:
+        with _reaper_lock:
+            if _reaper is None:
+                _reaper = LeakReaper(get_engine_config("leaks")["scan_interval_ms"])
+    return _reaper
@@ -1,35 +1,144 @@
 # pooler_engine/metrics.py
+import bisect
+import math
 import statistics
 import threading
 import psutil
 import time
+from .tracing import PHASES
 
-class MetricsRecorder:
+# Histogram bucket upper bounds: 0.01 ms upwards, growing by ~9% per bucket
+HISTOGRAM_BOUNDS = [0.01 * 2 ** (i / 8) for i in range(256)]
+
+
+class LatencyHistogram:
     """
-    Tracks runtime statistics including actual connection reuse.
+    Log-bucketed latency histogram in milliseconds.
+    Buckets grow by ~9% so percentiles stay within that relative error.
+    """
+    BOUNDS = HISTOGRAM_BOUNDS
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms):
+        self.counts[bisect.bisect_left(self.BOUNDS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self.BOUNDS[i] if i < len(self.BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0,
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3),
+        }
+
+class _MetricsShard:
     """
+    Counters and histograms written by a single thread only.
+    """
+    __slots__ = (
+        "successful_requests", "failed_connections", "shed_requests",
+        "coalesced_requests", "hedged_requests", "wait_total_ms", "wait_count",
+        "connections_created", "connections_reused", "peak_active_connections",
+        "spilled_results", "spilled_bytes", "phase_histograms", "request_histogram",
+    )
+
     def __init__(self):
-        # Request metrics
         self.successful_requests = 0
         self.failed_connections = 0
-        self.queue_wait_times = []
-        self.total_execution_time_ms = 0
-        
-        # Connection reuse metrics
+        self.shed_requests = 0
+        self.coalesced_requests = 0
+        self.hedged_requests = 0
+        self.wait_total_ms = 0.0
+        self.wait_count = 0
         self.connections_created = 0
         self.connections_reused = 0
         self.peak_active_connections = 0
-        
+        self.spilled_results = 0
+        self.spilled_bytes = 0
+        self.phase_histograms = {phase: LatencyHistogram() for phase in PHASES}
+        self.request_histogram = LatencyHistogram()
+
+
+class MetricsRecorder:
+    """
+    Tracks runtime statistics including actual connection reuse.
+    Each recording thread writes to its own shard without locking; shards are
+    only merged when the totals are read, so the hot path never contends.
+    """
+    _COUNTERS = (
+        "successful_requests", "failed_connections", "shed_requests",
+        "coalesced_requests", "hedged_requests", "connections_created",
+        "connections_reused", "spilled_results", "spilled_bytes",
+    )
+
+    def __init__(self):
+        self.total_execution_time_ms = 0
+
         # System metrics
         self.cpu_usage_percent = 0
         self.memory_usage_mb = 0
+
         self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
         self._cpu_samples = []
         self._mem_samples = []
 
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _MetricsShard()
+            # Registration is the only locked step, once per thread
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
     def update_wait_time(self, wait_seconds):
-        with self._lock:
-            self.queue_wait_times.append(wait_seconds * 1000)
+        shard = self._shard()
+        shard.wait_total_ms += wait_seconds * 1000
+        shard.wait_count += 1
+
+    def record_trace(self, trace, count_request=True):
+        """
+        Adds the trace's phases to the phase histograms and, unless
+        `count_request` is False (a hedge attempt), its total to request latency.
+        """
+        shard = self._shard()
+        total = 0
+        for phase, ms in trace.durations_ms().items():
+            shard.phase_histograms[phase].record(ms)
+            total += ms
+        if count_request:
+            shard.request_histogram.record(total)
 
     def record_utilization(self):
         with self._lock:
@@ -48,47 +157,87 @@ class MetricsRecorder:
             )
 
     def increment_created(self):
-        with self._lock:
-            self.connections_created += 1
+        self._shard().connections_created += 1
 
     def increment_reused(self):
-        with self._lock:
-            self.connections_reused += 1
+        self._shard().connections_reused += 1
+
+    def record_spill(self, nbytes):
+        shard = self._shard()
+        shard.spilled_results += 1
+        shard.spilled_bytes += nbytes
 
     def update_peak(self, current_active):
-        with self._lock:
-            self.peak_active_connections = max(
-                self.peak_active_connections, current_active
-            )
+        shard = self._shard()
+        if current_active > shard.peak_active_connections:
+            shard.peak_active_connections = current_active
 
     def increment_success(self):
-        with self._lock:
-            self.successful_requests += 1
+        self._shard().successful_requests += 1
 
     def increment_failure(self):
+        self._shard().failed_connections += 1
+
+    def increment_shed(self):
+        shard = self._shard()
+        shard.failed_connections += 1
+        shard.shed_requests += 1
+
+    def increment_coalesced(self):
+        self._shard().coalesced_requests += 1
+
+    def increment_hedged(self):
+        self._shard().hedged_requests += 1
+
+    def _merged(self):
+        """Sums every shard into one snapshot."""
         with self._lock:
-            self.failed_connections += 1
+            shards = list(self._shards)
+        merged = _MetricsShard()
+        for shard in shards:
+            for name in self._COUNTERS:
+                setattr(merged, name, getattr(merged, name) + getattr(shard, name))
+            merged.wait_total_ms += shard.wait_total_ms
+            merged.wait_count += shard.wait_count
+            merged.peak_active_connections = max(
+                merged.peak_active_connections, shard.peak_active_connections
+            )
+            for phase, histogram in shard.phase_histograms.items():
+                merged.phase_histograms[phase].merge(histogram)
+            merged.request_histogram.merge(shard.request_histogram)
+        return merged
 
     def summary(self):
-        avg_wait = statistics.mean(self.queue_wait_times) if self.queue_wait_times else 0
+        totals = self._merged()
+        avg_wait = totals.wait_total_ms / totals.wait_count if totals.wait_count else 0
         self.finalize_utilization()
         
-        total_connection_uses = self.connections_created + self.connections_reused
+        total_connection_uses = totals.connections_created + totals.connections_reused
         connection_reuse_rate = (
-            (self.connections_reused / total_connection_uses) * 100 
+            (totals.connections_reused / total_connection_uses) * 100 
             if total_connection_uses > 0 else 0
         )
         
         return {
-            "successful_requests": self.successful_requests,
-            "failed_connections": self.failed_connections,
+            "successful_requests": totals.successful_requests,
+            "failed_connections": totals.failed_connections,
+            "shed_requests": totals.shed_requests,
+            "coalesced_requests": totals.coalesced_requests,
+            "hedged_requests": totals.hedged_requests,
             "avg_queue_wait_ms": round(avg_wait, 2),
             "total_execution_time_ms": round(self.total_execution_time_ms, 2),
             "cpu_usage_percent": round(self.cpu_usage_percent, 2),
             "memory_usage_mb": round(self.memory_usage_mb, 2),
-            "connections_created": self.connections_created,
-            "connections_reused": self.connections_reused,
-            "peak_active_connections": self.peak_active_connections,
+            "connections_created": totals.connections_created,
+            "connections_reused": totals.connections_reused,
+            "peak_active_connections": totals.peak_active_connections,
             "connection_reuse_rate": round(connection_reuse_rate, 2),
-            "total_connection_uses": total_connection_uses
-        }
\ No newline at end of file
+            "total_connection_uses": total_connection_uses,
+            "spilled_results": totals.spilled_results,
+            "spilled_bytes": totals.spilled_bytes,
+            "request_latency_ms": totals.request_histogram.summary(),
+            "phase_breakdown_ms": {
+                phase: histogram.summary()
+                for phase, histogram in totals.phase_histograms.items()
+            },
+        }
@@ -0,0 +1,246 @@
+# pooler_engine/perfsuite.py
+
+"""
+Performance regression suite
+Benchmarks the pool's hot paths and an end-to-end run, and compares the
+throughput and p99 of each against a stored JSON baseline.
+"""
+
+import json
+import os
+import platform
+import threading
+import time
+from datetime import datetime, timezone
+from .context import Deadline, RequestContext
+from .metrics import LatencyHistogram, MetricsRecorder
+from .pool_manager import ConnectionPooler
+from .standin import standin_connect, standin_database
+from .tracing import RequestTrace
+
+# Bump when a benchmark changes what it measures; old baselines stop comparing
+SUITE_VERSION = 1
+
+
+def _result(ops, elapsed_s, histogram):
+    return {
+        "throughput": round(ops / elapsed_s, 2) if elapsed_s > 0 else 0,
+        "p99_ms": round(histogram.percentile(99), 4),
+        "ops": ops,
+    }
+
+
+def _standin_pool(pool_config, latency=0.0, name="perf-suite"):
+    pooler = ConnectionPooler(
+        standin_database(name), pool_config, connect=standin_connect(latency)
+    )
+    # Benchmarks measure the pool, not deduplication
+    pooler.coalesce_reads = False
+    return pooler
+
+
+def bench_acquire_release(iterations=20000):
+    """Slot + connection borrow and return on a warm pool, single thread."""
+    pooler = _standin_pool({"pool_size": 4, "queue_size": 10, "queue_timeout_ms": 1000})
+    histogram = LatencyHistogram()
+    metrics = MetricsRecorder()
+    try:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            t = time.perf_counter()
+            ctx = RequestContext(Deadline(1), metrics)
+            with pooler.condition:
+                pooler.active_connections += 1
+            conn = pooler._borrow_connection(ctx, "SELECT 1")
+            if pooler._end_borrow(conn):
+                pooler._return_connection(conn)
+                pooler._release_slot()
+            histogram.record((time.perf_counter() - t) * 1000)
+        elapsed = time.perf_counter() - started
+    finally:
+        pooler.shutdown()
+    return _result(iterations, elapsed, histogram)
+
+
+def record_request(metrics, trace):
+    """The MetricsRecorder calls one successful pooled request makes."""
+    metrics.update_wait_time(0.001)
+    metrics.increment_reused()
+    metrics.update_peak(4)
+    metrics.increment_success()
+    metrics.record_trace(trace)
+
+
+def bench_metrics_recording(threads=8, requests=10000):
+    """The per-request MetricsRecorder calls, from several threads at once."""
+    metrics = MetricsRecorder()
+    trace = RequestTrace()
+    trace.finish()
+    histograms = [LatencyHistogram() for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(histogram):
+        barrier.wait()
+        for _ in range(requests):
+            t = time.perf_counter()
+            record_request(metrics, trace)
+            histogram.record((time.perf_counter() - t) * 1000)
+
+    workers = [threading.Thread(target=worker, args=(h,)) for h in histograms]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    for h in histograms[1:]:
+        histograms[0].merge(h)
+    return _result(threads * requests, elapsed, histograms[0])
+
+
+def bench_queue_timeout(requests=200, queue_timeout_ms=20):
+    """
+    A saturated single-slot pool: how quickly queued requests give up.
+    p99 should stay close to the queue timeout.
+    """
+    pooler = _standin_pool(
+        {"pool_size": 1, "queue_size": requests, "queue_timeout_ms": queue_timeout_ms},
+        latency=queue_timeout_ms * 20 / 1000,
+    )
+    histogram = LatencyHistogram()
+    metrics = MetricsRecorder()
+    lock = threading.Lock()
+    try:
+        holder = threading.Thread(target=pooler.execute_one, args=("SELECT 1",))
+        holder.start()
+        while pooler.active_connections == 0:
+            time.sleep(0.001)
+
+        def waiter():
+            t = time.perf_counter()
+            pooler.execute_one("SELECT 1", metrics=metrics)
+            with lock:
+                histogram.record((time.perf_counter() - t) * 1000)
+
+        waiters = [threading.Thread(target=waiter) for _ in range(requests)]
+        started = time.perf_counter()
+        for w in waiters:
+            w.start()
+        for w in waiters:
+            w.join()
+        elapsed = time.perf_counter() - started
+        holder.join()
+    finally:
+        pooler.shutdown()
+    return _result(requests, elapsed, histogram)
+
+
+def bench_end_to_end(requests=1000, latency_ms=2, user_db=None):
+    """
+    A full execute_statements run, against `user_db` when given, otherwise
+    against stand-in connections with `latency_ms` per statement.
+    """
+    config = {"pool_size": 10, "queue_size": requests, "queue_timeout_ms": 10000}
+    if user_db is not None:
+        pooler = ConnectionPooler(user_db, config)
+        pooler.coalesce_reads = False
+    else:
+        pooler = _standin_pool(config, latency=latency_ms / 1000)
+    try:
+        summary = pooler.execute_statements([("SELECT 1", None, True)] * requests, caller="perf-suite")
+    finally:
+        pooler.shutdown()
+    elapsed_s = summary["total_execution_time_ms"] / 1000
+    return {
+        "throughput": round(summary["successful_requests"] / elapsed_s, 2) if elapsed_s else 0,
+        "p99_ms": summary["request_latency_ms"]["p99"],
+        "ops": summary["successful_requests"],
+    }
+
+
+BENCHMARKS = {
+    "acquire_release": bench_acquire_release,
+    "metrics_recording": bench_metrics_recording,
+    "queue_timeout": bench_queue_timeout,
+    "end_to_end": bench_end_to_end,
+}
+
+
+def run_suite(names=None, repeat=3, user_db=None):
+    """
+    Runs each benchmark `repeat` times and keeps the best throughput and the
+    best p99, which are the least noisy figures on a shared machine.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        runs = [
+            BENCHMARKS[name](user_db=user_db) if name == "end_to_end" else BENCHMARKS[name]()
+            for _ in range(repeat)
+        ]
+        results[name] = {
+            "throughput": max(r["throughput"] for r in runs),
+            "p99_ms": min(r["p99_ms"] for r in runs),
+            "ops": runs[0]["ops"],
+        }
+    return results
+
+
+def build_baseline(results, target="standin"):
+    return {
+        "version": SUITE_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "target": target,
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "benchmarks": results,
+    }
+
+
+def load_baseline(path):
+    """Returns the stored baseline, or None if there is none yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, baseline):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Checks each benchmark against the baseline. A regression is throughput
+    below (1 - tolerance) of the baseline or p99 above (1 + tolerance) of it.
+    """
+    rows = []
+    for name, current in results.items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            rows.append({"benchmark": name, "status": "new", **current})
+            continue
+        throughput_change = (
+            (current["throughput"] - previous["throughput"]) / previous["throughput"]
+            if previous["throughput"] else 0
+        )
+        p99_change = (
+            (current["p99_ms"] - previous["p99_ms"]) / previous["p99_ms"]
+            if previous["p99_ms"] else 0
+        )
+        regressed = throughput_change < -tolerance or p99_change > tolerance
+        rows.append({
+            "benchmark": name,
+            "status": "regressed" if regressed else "ok",
+            "throughput": current["throughput"],
+            "baseline_throughput": previous["throughput"],
+            "throughput_change_percent": round(throughput_change * 100, 2),
+            "p99_ms": current["p99_ms"],
+            "baseline_p99_ms": previous["p99_ms"],
+            "p99_change_percent": round(p99_change * 100, 2),
+        })
+    return rows
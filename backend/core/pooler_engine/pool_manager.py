@@ -1,168 +1,711 @@
 import threading
 import queue
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from .executor import get_executor, ExecutorRejected
 from .metrics import MetricsRecorder
-from .db_client import execute_db_query
-from .config import get_pool_config
+from .db_client import open_connection, run_query, is_reusable
+from .config import get_pool_config, get_engine_config
+from .context import Deadline, RequestContext
+from .tracing import TraceCollector
+from .governor import budget_keys, get_governor, BudgetExhausted
+from .fingerprint import StatementStats, fingerprint
+from .capture import CaptureWriter
+from .leaks import BorrowRecord, ConnectionInfo, get_reaper
+from .admission import CoDelController
+from .singleflight import SingleFlight
+from .hedging import AttemptMetrics, HedgeRace, Hedger, get_hedge_scheduler
 
 
 class ConnectionPooler:
     """
     Python-based PostgreSQL connection pooler with actual connection reuse tracking.
     """
-    def __init__(self, user_db, pool_config=None):
+    def __init__(self, user_db, pool_config=None, connect=None):
         from .config import get_pool_config
         config = pool_config or get_pool_config(user_db)
         self.user_db = user_db
+        # Opens a physical connection; open_connection unless replaced for benchmarks
+        self._connect = connect
 
         # Configuration parameters
         self.pool_size = config["pool_size"]
         self.queue_size = config["queue_size"]
         self.queue_timeout = config["queue_timeout_ms"] / 1000
+        deadline_config = get_engine_config("deadline")
+        self.statement_timeout = deadline_config["statement_timeout_ms"] / 1000
+        self.cancel_grace = deadline_config["cancel_grace_ms"] / 1000
+        self.max_sampled_traces = get_engine_config("tracing")["max_sampled_traces"]
+        self.idle_timeout = get_engine_config("idle")["timeout_ms"] / 1000
 
         # Runtime state
         self.active_connections = 0
+        self.open_connections = 0
         self.connections_created = 0
         self.lock = threading.Lock()
         self.condition = threading.Condition(self.lock)
         self.wait_queue = queue.Queue(maxsize=self.queue_size)
-        self.metrics = MetricsRecorder()
+        self.idle_connections = deque()
+        self.statement_stats = StatementStats(get_engine_config("statements")["max_entries"])
+        self.capture = None
         self._shutdown = False
+        self.coalesce_reads = get_engine_config("coalescing")["enabled"]
+        self.flights = SingleFlight()
+        hedging = get_engine_config("hedging")
+        self.hedger = Hedger(
+            hedging["percentile"], hedging["budget_percent"],
+            hedging["min_samples"], hedging["enabled"],
+        )
+        admission = get_engine_config("admission")
+        self.admission = CoDelController(
+            admission["target_ms"], admission["interval_ms"], admission["enabled"]
+        )
 
-    def _execute_query(self, query):
+        # Bookkeeping per physical connection and per outstanding borrow
+        leak_config = get_engine_config("leaks")
+        self.leak_threshold = leak_config["threshold_ms"] / 1000
+        self.reclaim_leaks = leak_config["reclaim"]
+        self.capture_borrow_stack = leak_config["capture_stack"]
+        self.connection_info = {}
+        self.borrowed = {}
+        self.leaks_detected = 0
+        self.leaks_reclaimed = 0
+
+        # Shared budgets across every pool on the same host and owner
+        self.host_key, self.owner_key = budget_keys(user_db)
+        self.governor = get_governor()
+        self.governor.register(self)
+        get_reaper().register(self)
+
+    def reconfigure(self, config):
+        """
+        Applies a new pool configuration to the live pool without pausing it.
+        Growing wakes waiters so they open connections on demand; shrinking
+        retires idle connections now and busy ones as they are returned.
+        Queue limit and timeout apply to current and future waiters.
+        """
+        with self.condition:
+            self.pool_size = config["pool_size"]
+            self.queue_size = config["queue_size"]
+            self.queue_timeout = config["queue_timeout_ms"] / 1000
+            with self.wait_queue.mutex:
+                self.wait_queue.maxsize = self.queue_size
+
+            retired = []
+            while self.idle_connections and self.open_connections > self.pool_size:
+                retired.append(self.idle_connections.popleft())
+                self.open_connections -= 1
+
+            # Waiters re-check free slots and recompute their remaining timeout
+            self.condition.notify_all()
+
+        for conn in retired:
+            self._close(conn)
+
+    def start_capture(self, name):
+        """
+        Starts writing every statement run through this pool to a capture log.
+        """
+        config = get_engine_config("capture")
+        writer = CaptureWriter(
+            config["directory"], name, config["max_bytes"], config["max_files"]
+        )
+        previous, self.capture = self.capture, writer
+        if previous is not None:
+            previous.close()
+        return writer
+
+    def stop_capture(self):
+        writer, self.capture = self.capture, None
+        if writer is not None:
+            writer.close()
+        return writer
+
+    def _close(self, conn):
+        """Closes a physical connection and returns its permit to the governor."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.lock:
+            self.connection_info.pop(id(conn), None)
+        self.governor.release_connection(self)
+
+    def retire_idle_connection(self):
+        """
+        Closes the oldest idle connection so another pool on the host can use
+        the permit. Returns False if nothing was idle.
+        """
+        with self.lock:
+            if not self.idle_connections:
+                return False
+            conn = self.idle_connections.popleft()
+            self.open_connections -= 1
+        self._close(conn)
+        return True
+
+    def close_idle(self):
+        """
+        Closes connections idle for longer than the idle timeout, so a pool
+        nobody uses stops holding backends on the server.
+        """
+        if not self.idle_timeout:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self.lock:
+            # The oldest returned connection is at the left
+            while self.idle_connections:
+                info = self.connection_info.get(id(self.idle_connections[0]))
+                if info is not None and info.last_used_at > cutoff:
+                    break
+                expired.append(self.idle_connections.popleft())
+                self.open_connections -= 1
+        for conn in expired:
+            self._close(conn)
+
+    def _track_borrow(self, conn, query):
+        # Called with self.lock held
+        info = self.connection_info.get(id(conn))
+        if info is None:
+            info = self.connection_info[id(conn)] = ConnectionInfo()
+        info.use_count += 1
+        self.borrowed[id(conn)] = BorrowRecord(
+            conn, info, query, capture_stack=self.capture_borrow_stack
+        )
+
+    def _end_borrow(self, conn):
+        """
+        Drops the borrow record. Returns False if the reaper already reclaimed
+        the connection (and its slot), so the borrower must not release them again.
+        """
+        with self.lock:
+            record = self.borrowed.pop(id(conn), None)
+            if record is None:
+                return False
+            record.info.last_used_at = time.monotonic()
+            return True
+
+    def _borrow_connection(self, ctx, query=None):
+        """
+        Hands out an idle physical connection, opening a new one if none is idle.
+        New connections wait (FIFO, up to the request deadline) for a global permit.
+        Must be called while holding a pool slot.
+        """
+        metrics = ctx.metrics
+        with self.lock:
+            while self.idle_connections:
+                conn = self.idle_connections.pop()
+                if not conn.closed:
+                    metrics.increment_reused()
+                    self._track_borrow(conn, query)
+                    return conn
+                self.open_connections -= 1
+                self.connection_info.pop(id(conn), None)
+                self.governor.release_connection(self)
+
+        self.governor.acquire_connection(self, ctx.deadline)
+        try:
+            conn = (self._connect or open_connection)(self.user_db)
+        except Exception:
+            self.governor.release_connection(self)
+            raise
+        with self.lock:
+            self.open_connections += 1
+            self.connections_created += 1
+            self.connection_info[id(conn)] = ConnectionInfo(conn.get_backend_pid())
+            self._track_borrow(conn, query)
+        metrics.increment_created()
+        return conn
+
+    def check_leaks(self):
+        """
+        Flags borrows held past the leak threshold. With reclaim enabled the
+        statement is cancelled, the connection closed and its slot freed.
+        """
+        now = time.monotonic()
+        reclaimed = []
+        with self.lock:
+            for key, record in list(self.borrowed.items()):
+                if record.held_for(now) < self.leak_threshold:
+                    continue
+                if not record.leak_flagged:
+                    record.leak_flagged = True
+                    self.leaks_detected += 1
+                    print(
+                        f"Connection leak suspected: held {record.held_for(now):.1f}s "
+                        f"by {record.thread_name}"
+                        + (f"\n{''.join(record.stack)}" if record.stack else "")
+                    )
+                if self.reclaim_leaks:
+                    del self.borrowed[key]
+                    self.open_connections -= 1
+                    self.leaks_reclaimed += 1
+                    reclaimed.append(record.conn)
+
+        for conn in reclaimed:
+            try:
+                conn.cancel()
+            except Exception:
+                pass
+            self._close(conn)
+            self._release_slot()
+
+    def _return_connection(self, conn, discard=False):
+        """
+        Puts a connection back in the idle set, or closes it if it can't be reused,
+        the pool has shrunk below its current size, or another request is queued
+        for the global connection budget.
+        """
+        contended = self.governor.connection_contended(self)
+        with self.lock:
+            keep = (
+                not discard
+                and not self._shutdown
+                and not contended
+                and self.open_connections <= self.pool_size
+                and is_reusable(conn)
+            )
+            if keep:
+                self.idle_connections.append(conn)
+                return
+            self.open_connections -= 1
+        self._close(conn)
+
+    def _release_slot(self):
+        with self.condition:
+            self.active_connections -= 1
+            self.condition.notify()
+
+    def _record_statement(self, ctx, conn, query, params, started, rows=0, error=False):
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.statement_stats.record(query, duration_ms, rows=rows, error=error)
+        capture = self.capture
+        if capture is not None:
+            # The server backend is the session, so replay keeps per-backend order.
+            # Captured latency is end to end, the same span the replay times.
+            capture.record(ctx.arrived_at, conn.get_backend_pid(),
+                           (time.monotonic() - ctx.arrived_at) * 1000,
+                           query, params, error=error)
+
+    def execute_one(self, query, params=None, metrics=None, read_only=False):
+        """
+        Runs a single statement through the pool.
+        Returns None on success, or the failure message.
+        """
+        ctx = RequestContext(
+            Deadline(self.queue_timeout + self.statement_timeout),
+            metrics or MetricsRecorder(),
+        )
+        return self._execute_query(query, params, ctx, read_only=read_only)
+
+    def fetch(self, query, params=None, row_limit=None, read_only=False):
+        """
+        Runs a single statement through the pool and keeps its rows.
+        Returns (failure message or None, ResultBuffer or None); the caller
+        closes the buffer. Not coalesced or hedged, since the rows are owned.
+        At most `row_limit` rows are fetched; `read_only` runs the statement
+        in a READ ONLY transaction.
+        """
+        ctx = RequestContext(
+            Deadline(self.queue_timeout + self.statement_timeout),
+            MetricsRecorder(), keep_result=True,
+            read_only=read_only, row_limit=row_limit,
+        )
+        try:
+            outcome = self._run_request(query, params, ctx)
+        finally:
+            ctx.trace.finish()
+        return outcome, ctx.result
+
+    def _execute_query(self, query, params, ctx, collector=None, read_only=False):
+        try:
+            # Coalescing and hedging share or repeat the statement, so both need
+            # the caller's word that it is read-only, and a single SELECT
+            if read_only and fingerprint(query).is_single_read:
+                if self.coalesce_reads:
+                    return self._run_coalesced(query, params, ctx)
+                return self._run_read(query, params, ctx)
+            return self._run_request(query, params, ctx)
+        finally:
+            ctx.trace.finish()
+            ctx.metrics.record_trace(ctx.trace)
+            if collector is not None:
+                collector.offer(ctx.trace)
+
+    def _run_coalesced(self, query, params, ctx):
+        """
+        Joins an identical read already in flight on this pool, or leads one.
+        Followers take the leader's outcome without using a slot or connection.
+        """
+        metrics = ctx.metrics
+        try:
+            outcome, shared = self.flights.do(
+                (query, repr(params)),
+                lambda: self._run_read(query, params, ctx),
+                timeout=ctx.deadline.remaining(),
+            )
+        except TimeoutError:
+            metrics.increment_failure()
+            return "try again later - deadline exceeded"
+        if shared:
+            metrics.increment_coalesced()
+            if outcome is None:
+                metrics.increment_success()
+            else:
+                metrics.increment_failure()
+        return outcome
+
+    def _run_read(self, query, params, ctx):
+        """
+        Runs a read, hedging it when enabled: if it is still running after the
+        pool's latency percentile, a duplicate races it on another connection.
+        """
+        if not self.hedger.enabled:
+            return self._run_request(query, params, ctx)
+        started = time.monotonic()
+        threshold = self.hedger.read_threshold()
+        if threshold is None:
+            outcome = self._run_request(query, params, ctx)
+            self.hedger.record((time.monotonic() - started) * 1000)
+            return outcome
+
+        # The request's own context is the primary attempt, so a caller that
+        # gives up still cancels it; outcomes are counted once the race ends
+        metrics = ctx.metrics
+        ctx.metrics = AttemptMetrics(metrics)
+        race = HedgeRace()
+        race.join(ctx)
+
+        def hedge():
+            attempt = RequestContext(ctx.deadline, ctx.metrics, ctx.trace.request_id)
+            if not ctx.cancelled and race.join(attempt, hedge=True):
+                try:
+                    race.finish(attempt, self._run_request(query, params, attempt))
+                finally:
+                    attempt.trace.finish()
+                    # The request's latency is counted once, from its own trace
+                    metrics.record_trace(attempt.trace, count_request=False)
+
+        get_hedge_scheduler().schedule(threshold, race, self.hedger, hedge)
+        try:
+            race.finish(ctx, self._run_request(query, params, ctx))
+            decided = race.done.wait(ctx.deadline.remaining())
+        finally:
+            ctx.metrics = metrics
+        if not decided:
+            metrics.increment_failure()
+            return "try again later - deadline exceeded"
+
+        self.hedger.record((time.monotonic() - started) * 1000)
+        if race.hedged:
+            metrics.increment_hedged()
+            if race.winner is not ctx:
+                self.hedger.record_win()
+        if race.outcome is None:
+            metrics.increment_success()
+        else:
+            metrics.increment_failure()
+        return race.outcome
+
+    def _run_request(self, query, params, ctx):
         if self._shutdown:
             return "shutdown"
+        try:
+            self.governor.acquire_request(self, ctx.deadline)
+        except BudgetExhausted as e:
+            ctx.metrics.increment_failure()
+            return f"try again later - {e}"
+        try:
+            return self._run_admitted(query, params, ctx)
+        finally:
+            self.governor.release_request(self)
+
+    def _run_admitted(self, query, params, ctx):
+        metrics = ctx.metrics
+        if ctx.cancelled or ctx.deadline.expired():
+            metrics.increment_failure()
+            return "try again later - deadline exceeded"
             
         start_wait = time.time()
+        got_slot = False
         
         with self.condition:
             if self._shutdown:
                 return "shutdown"
                 
-            # Try to get slot immediately
-            if self.active_connections < self.pool_size:
-                
-                # DETERMINE IF NEW CONNECTION OR REUSE
-                if self.connections_created < self.pool_size:
-                    # This is a NEW connection
-                    self.connections_created += 1
-                    self.metrics.increment_created()
-                    connection_type = "created"
-                else:
-                    # This is CONNECTION REUSE
-                    self.metrics.increment_reused()
-                    connection_type = "reused"
-                
+            # Try to get slot immediately, unless others are already queued for one
+            if self.active_connections < self.pool_size and self.wait_queue.empty():
                 self.active_connections += 1
-                self.metrics.update_peak(self.active_connections)
+                metrics.update_peak(self.active_connections)
+                self.admission.record_sojourn(0)
                 got_slot = True
             else:
                 # Pool full - try to enter queue
                 if self.wait_queue.full():
-                    self.metrics.increment_failure()
+                    metrics.increment_failure()
                     return "try again later - queue full"
                 
                 # Add to queue and wait
                 self.wait_queue.put(1)
-                got_slot = False
                 wait_start = time.time()
                 
                 while not got_slot and not self._shutdown:
-                    remaining_time = self.queue_timeout - (time.time() - wait_start)
-                    if remaining_time <= 0:
+                    # Under a standing queue the allowed wait drops to the CoDel target
+                    max_wait = self.admission.max_wait(
+                        self.queue_timeout, self.wait_queue.qsize()
+                    )
+                    remaining_time = min(
+                        max_wait - (time.time() - wait_start),
+                        ctx.deadline.remaining(),
+                    )
+                    if remaining_time <= 0 or ctx.cancelled:
                         try:
                             self.wait_queue.get_nowait()
                         except queue.Empty:
                             pass
-                        self.metrics.increment_failure()
+                        # Pass on the wakeup this waiter may have consumed
+                        self.condition.notify()
+                        if ctx.cancelled or ctx.deadline.expired():
+                            metrics.increment_failure()
+                            return "try again later - deadline exceeded"
+                        if max_wait < self.queue_timeout:
+                            self.admission.record_shed()
+                            metrics.increment_shed()
+                            return "try again later - overloaded"
+                        metrics.increment_failure()
                         return "try again later - timeout"
                     
-                    self.condition.wait(remaining_time)
+                    # Wake at least once per target so a shift to overload is noticed
+                    self.condition.wait(
+                        min(remaining_time, self.admission.target)
+                        if self.admission.enabled else remaining_time
+                    )
                     
-                    # When we get a slot from the queue, it's ALWAYS REUSE
                     if self.active_connections < self.pool_size and not self._shutdown:
-                        self.metrics.increment_reused()
                         self.active_connections += 1
-                        self.metrics.update_peak(self.active_connections)
+                        metrics.update_peak(self.active_connections)
                         got_slot = True
                         self.wait_queue.get()
-                        connection_type = "reused_from_queue"
+                        self.admission.record_sojourn(
+                            time.time() - wait_start, self.wait_queue.qsize()
+                        )
+
+                if not got_slot:
+                    try:
+                        self.wait_queue.get_nowait()
+                    except queue.Empty:
+                        pass
         
         if self._shutdown:
-            with self.condition:
-                self.active_connections -= 1
-                self.condition.notify()
+            if got_slot:
+                self._release_slot()
             return "shutdown"
 
         wait_time = time.time() - start_wait
-        self.metrics.update_wait_time(wait_time)
+        metrics.update_wait_time(wait_time)
 
+        conn = None
+        ctx.trace.enter("connect")
         try:
-            if not self._shutdown:
-                execute_db_query(self.user_db, query)
-                self.metrics.increment_success()
+            conn = self._borrow_connection(ctx, query)
+            if not ctx.attach(conn):
+                metrics.increment_failure()
+                return "try again later - deadline exceeded"
+            started = time.perf_counter()
+            try:
+                # The statement may only use what is left of the request budget
+                result = run_query(
+                    conn, query, params,
+                    statement_timeout_ms=ctx.deadline.remaining_ms(),
+                    trace=ctx.trace,
+                    read_only=ctx.read_only,
+                    row_limit=ctx.row_limit,
+                )
+            except Exception:
+                self._record_statement(ctx, conn, query, params, started, error=True)
+                raise
+            finally:
+                ctx.detach()
+            self._record_statement(ctx, conn, query, params, started,
+                                   rows=len(result) if result else 0)
+            if result is not None:
+                if result.spilled:
+                    metrics.record_spill(result.spilled_bytes)
+                if ctx.keep_result:
+                    ctx.result = result
+                else:
+                    result.close()
+            metrics.increment_success()
+        except BudgetExhausted as e:
+            metrics.increment_failure()
+            return f"try again later - {e}"
         except Exception as e:
-            self.metrics.increment_failure()
+            metrics.increment_failure()
             print(f"Query execution error: {e}")
+            return f"query error - {e}"
         finally:
-            with self.condition:
-                self.active_connections -= 1
-                self.condition.notify()
+            ctx.trace.enter("release")
+            owned = True
+            if conn is not None:
+                owned = self._end_borrow(conn)
+                if owned:
+                    # A connection that was cancelled mid-flight is not trusted again
+                    self._return_connection(conn, discard=ctx.cancelled)
+            if owned:
+                self._release_slot()
 
-    def execute_requests(self, query, num_requests):
-        self._shutdown = False
-        self.connections_created = 0
-        self.active_connections = 0
+    def execute_requests(self, query, num_requests, caller=None,
+                         trace_sample_rate=0.0, trace_format="json", read_only=False):
+        """Runs the same query `num_requests` times."""
+        return self.execute_statements(
+            [(query, None, read_only)] * num_requests, caller=caller,
+            trace_sample_rate=trace_sample_rate, trace_format=trace_format,
+        )
+
+    def execute_statements(self, statements, caller=None,
+                           trace_sample_rate=0.0, trace_format="json", accountant=None):
+        """
+        Runs a pre-generated list of (sql, params, read_only) triples through
+        the pool concurrently and returns the run summary.
+        An optional ResourceAccountant is charged the CPU time of each request.
+        """
+        num_requests = len(statements)
         start_total = time.time()
         results = []
+        executor = get_executor()
+        # Metrics are scoped to this run; the pool itself may be shared
+        metrics = MetricsRecorder()
+        request_budget = self.queue_timeout + self.statement_timeout
+        collector = TraceCollector(trace_sample_rate, self.max_sampled_traces)
+        task = accountant.wrap(self._execute_query) if accountant else self._execute_query
 
         try:
-            with ThreadPoolExecutor(max_workers=min(num_requests, 100)) as executor:
-                futures = [executor.submit(self._execute_query, query) for _ in range(num_requests)]
+            pending = []
+            for request_id, (query, params, read_only) in enumerate(statements):
+                ctx = RequestContext(Deadline(request_budget), metrics, request_id)
+                try:
+                    pending.append((ctx, executor.submit(
+                        caller, task, query, params, ctx, collector, read_only
+                    )))
+                except ExecutorRejected as e:
+                    metrics.increment_failure()
+                    results.append(f"try again later - {e}")
 
-                sampler_stop = False
-                def sampler():
-                    while not sampler_stop:
-                        self.metrics.record_utilization()
-                        time.sleep(0.1)
+            sampler_stop = False
+            def sampler():
+                while not sampler_stop:
+                    metrics.record_utilization()
+                    time.sleep(0.1)
 
-                sampler_thread = threading.Thread(target=sampler, daemon=True)
-                sampler_thread.start()
+            sampler_thread = threading.Thread(target=sampler, daemon=True)
+            sampler_thread.start()
 
-                for future in futures:
-                    try:
-                        result = future.result(timeout=self.queue_timeout + 10)
-                        results.append(result)
-                    except Exception as e:
-                        results.append(f"Future error: {e}")
+            for ctx, future in pending:
+                try:
+                    result = future.result(timeout=ctx.deadline.remaining() + self.cancel_grace)
+                    results.append(result)
+                except FutureTimeoutError:
+                    # Give up on the request and stop its query on the server
+                    ctx.cancel()
+                    results.append("cancelled - deadline exceeded")
+                except Exception as e:
+                    results.append(f"Future error: {e}")
 
-                sampler_stop = True
-                sampler_thread.join()
+            sampler_stop = True
+            sampler_thread.join()
 
         except Exception as e:
             print(f"Executor error: {e}")
             return {"error": f"Executor failed: {str(e)}"}
 
-        self.metrics.total_execution_time_ms = (time.time() - start_total) * 1000
-        summary = self.metrics.summary()
+        metrics.total_execution_time_ms = (time.time() - start_total) * 1000
+        summary = metrics.summary()
         summary['total_requests'] = num_requests
+        # Outcomes come from what the caller saw: a request it cancelled is a
+        # failure even if its worker finishes (and counts itself) after this point
+        succeeded = sum(1 for result in results if result is None)
+        summary['successful_requests'] = succeeded
+        summary['failed_connections'] = len(results) - succeeded
+        summary['cancelled_requests'] = sum(
+            1 for result in results if result == "cancelled - deadline exceeded"
+        )
         
         # Efficiency calculations
+        created = summary['connections_created']
         summary['connection_efficiency'] = {
             'pool_size': self.pool_size,
-            'actual_connections_created': self.connections_created,
+            'actual_connections_created': created,
             'connection_utilization_percent': round(
-                (self.connections_created / self.pool_size) * 100, 2
+                (created / self.pool_size) * 100, 2
             ) if self.pool_size > 0 else 0,
-            'maximum_possible_reuse': max(0, num_requests - self.connections_created),
+            'maximum_possible_reuse': max(0, num_requests - created),
             'actual_reuse_achieved': summary['connections_reused']
         }
+        if trace_sample_rate > 0:
+            summary['trace_sample'] = collector.export(trace_format)
         
         return summary
 
+    def stats(self):
+        """Point-in-time view of the live pool."""
+        with self.lock:
+            return {
+                "pool_size": self.pool_size,
+                "queue_size": self.queue_size,
+                "queue_timeout_ms": round(self.queue_timeout * 1000),
+                "active_connections": self.active_connections,
+                "open_connections": self.open_connections,
+                "idle_connections": len(self.idle_connections),
+                "waiting_requests": self.wait_queue.qsize(),
+                "connections_created": self.connections_created,
+                "borrowed_connections": len(self.borrowed),
+                "leaks_detected": self.leaks_detected,
+                "leaks_reclaimed": self.leaks_reclaimed,
+                "admission": self.admission.stats(),
+                "coalesced_requests": self.flights.coalesced,
+                "hedging": self.hedger.stats(),
+            }
+
+    def connections(self):
+        """
+        Every physical connection in the pool with its state, age, use count,
+        and for borrowed ones the holder and current statement.
+        """
+        now = time.monotonic()
+        with self.lock:
+            rows = []
+            for record in self.borrowed.values():
+                rows.append({
+                    "state": "active",
+                    "backend_pid": record.info.backend_pid,
+                    "age_s": round(now - record.info.created_at, 3),
+                    "use_count": record.info.use_count,
+                    "held_for_s": round(record.held_for(now), 3),
+                    "thread": record.thread_name,
+                    "statement": record.statement,
+                    "suspected_leak": record.leak_flagged,
+                    "stack": "".join(record.stack) if record.stack else None,
+                })
+            for conn in self.idle_connections:
+                info = self.connection_info.get(id(conn)) or ConnectionInfo()
+                rows.append({
+                    "state": "idle",
+                    "backend_pid": info.backend_pid,
+                    "age_s": round(now - info.created_at, 3),
+                    "use_count": info.use_count,
+                    "idle_for_s": round(now - info.last_used_at, 3),
+                })
+            return rows
+
     def shutdown(self):
         """Gracefully shutdown the pooler"""
         self._shutdown = True
+        self.stop_capture()
         with self.condition:
-            self.condition.notify_all()
\ No newline at end of file
+            self.condition.notify_all()
+            idle, self.idle_connections = list(self.idle_connections), deque()
+            self.open_connections -= len(idle)
+        for conn in idle:
+            self._close(conn)
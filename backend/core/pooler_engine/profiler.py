@@ -0,0 +1,135 @@
+# pooler_engine/profiler.py
+
+"""
+Sampling profiler for pooler runs
+Periodically snapshots the stacks of pooler threads via sys._current_frames
+and aggregates them into collapsed stacks (flamegraph input) and top functions.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import thread as futures_thread
+from .config import get_engine_config
+
+# Long-lived service threads: always parked, never part of a run
+BACKGROUND_THREADS = ("pooler-reaper", "pooler-hedger")
+
+# Innermost frame of an executor worker that is waiting for a task
+_IDLE_WORKER = futures_thread._worker.__code__
+
+
+class SamplingProfiler:
+    """
+    Samples every live thread whose name starts with `thread_prefix`, except
+    the background threads and executor workers with no task to run.
+    Use as a context manager around the code being measured.
+    """
+    def __init__(self, interval_ms=10, thread_prefix="pooler-", max_depth=64):
+        self.interval = interval_ms / 1000
+        self.thread_prefix = thread_prefix
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="profiler-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.monotonic()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = os.path.basename(code.co_filename)
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+            self._labels[code] = label
+        return label
+
+    def _sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident, "")
+            if not name.startswith(self.thread_prefix) or name in BACKGROUND_THREADS:
+                continue
+            if frame.f_code is _IDLE_WORKER:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def collapsed(self):
+        """Brendan Gregg collapsed-stack format: `root;child;leaf count` per line."""
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()
+        )
+
+    def top_functions(self, n=20):
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            if not stack:
+                continue
+            self_counts[stack[-1]] += count
+            for label in set(stack):
+                total_counts[label] += count
+        samples = self.samples or 1
+        return [
+            {
+                "function": label,
+                "self_samples": count,
+                "self_percent": round(count / samples * 100, 2),
+                "total_percent": round(total_counts[label] / samples * 100, 2),
+            }
+            for label, count in self_counts.most_common(n)
+        ]
+
+    def report(self, top_n=20):
+        duration = (self.stopped_at or time.monotonic()) - (self.started_at or time.monotonic())
+        return {
+            "samples": self.samples,
+            "interval_ms": round(self.interval * 1000, 2),
+            "duration_s": round(duration, 3),
+            "top_functions": self.top_functions(top_n),
+            "collapsed_stacks": self.collapsed(),
+        }
+
+
+def build_profiler():
+    """
+    Returns a SamplingProfiler configured from the engine settings.
+    """
+    config = get_engine_config("profiler")
+    return SamplingProfiler(interval_ms=config["interval_ms"])
+
+def profiler_top_n():
+    return get_engine_config("profiler")["top_n"]
@@ -0,0 +1,68 @@
+# pooler_engine/registry.py
+
+"""
+Live pool registry
+Keeps one long-lived ConnectionPooler per user database so warm connections
+survive between test runs, and applies configuration changes to it in place.
+"""
+
+import threading
+from .config import get_pool_config
+from .pool_manager import ConnectionPooler
+
+_poolers = {}
+_lock = threading.Lock()
+
+
+def connection_signature(user_db):
+    """Fields that identify the physical target of a pool's connections."""
+    password = user_db._password
+    if isinstance(password, memoryview):
+        password = bytes(password)
+    return (user_db.host, user_db.port, user_db.dbname, user_db.username, password)
+
+
+def get_pooler(user_db):
+    """
+    Returns the live pool for a user database, creating it on first use.
+    """
+    with _lock:
+        pooler = _poolers.get(user_db.id)
+        if pooler is None:
+            pooler = ConnectionPooler(user_db)
+            pooler.signature = connection_signature(user_db)
+            _poolers[user_db.id] = pooler
+        return pooler
+
+
+def find_pooler(db_id):
+    """
+    Returns the live pool for a user database, or None; never creates one.
+    """
+    with _lock:
+        return _poolers.get(db_id)
+
+
+def refresh_pooler(user_db):
+    """
+    Brings a live pool in line with an updated user database.
+    Pool settings are applied online; a changed connection target retires the pool.
+    """
+    with _lock:
+        pooler = _poolers.get(user_db.id)
+        if pooler is None:
+            return
+        if pooler.signature != connection_signature(user_db):
+            del _poolers[user_db.id]
+        else:
+            pooler.user_db = user_db
+            pooler.reconfigure(get_pool_config(user_db))
+            return
+    pooler.shutdown()
+
+
+def discard_pooler(db_id):
+    with _lock:
+        pooler = _poolers.pop(db_id, None)
+    if pooler is not None:
+        pooler.shutdown()
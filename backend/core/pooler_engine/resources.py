@@ -0,0 +1,205 @@
+# pooler_engine/resources.py
+
+"""
+Resource accounting for pooled and direct runs
+Attributes CPU time, Python allocations, client sockets and server backends
+to a single run instead of diffing process-wide counters around it.
+"""
+
+import socket
+import threading
+import time
+import tracemalloc
+import psutil
+from .context import Deadline
+from .db_client import open_connection
+from .governor import BudgetExhausted, get_governor
+
+BACKENDS_QUERY = """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE datname = current_database() AND pid <> pg_backend_pid()
+"""
+
+
+class ResourceAccountant:
+    """
+    Measures one run. Work submitted through `wrap` is charged its own thread
+    CPU time, so concurrent runs on the shared executor don't pollute each other.
+    A sampler thread tracks sockets to the target, RSS and server backends.
+    Sockets and backends already open at start (other pools, Django's own
+    database, the monitor) form a baseline that the run is measured against.
+    """
+    def __init__(self, user_db=None, trace_allocations=False, sample_interval=0.05):
+        self.user_db = user_db
+        self.trace_allocations = trace_allocations
+        self.sample_interval = sample_interval
+        self.cpu_seconds = 0.0
+        self.tasks = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._monitor = None
+        self._started_tracing = False
+        self._process = psutil.Process()
+        self._socket_samples = []
+        self._backend_samples = []
+        self._rss_start = 0
+        self._rss_peak = 0
+        self._baseline_backends = None
+        self._baseline_sockets = 0
+        self._target = frozenset()
+        self._alloc_start = 0
+        self.started_at = None
+        self.stopped_at = None
+
+    def wrap(self, fn):
+        """Returns `fn` instrumented to charge its thread CPU time to this run."""
+        def accounted(*args, **kwargs):
+            started = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                spent = time.thread_time() - started
+                with self._lock:
+                    self.cpu_seconds += spent
+                    self.tasks += 1
+        return accounted
+
+    def _resolve_target(self):
+        """Addresses of the target host; the port alone also matches other servers."""
+        if self.user_db is None:
+            return frozenset()
+        try:
+            infos = socket.getaddrinfo(
+                self.user_db.host, self.user_db.port, proto=socket.IPPROTO_TCP
+            )
+        except (OSError, UnicodeError):
+            return frozenset()
+        return frozenset((info[4][0], self.user_db.port) for info in infos)
+
+    def _count_sockets(self):
+        if not self._target:
+            return 0
+        try:
+            return sum(
+                1 for c in self._process.net_connections(kind="tcp")
+                if c.raddr and (c.raddr.ip, c.raddr.port) in self._target
+            )
+        except psutil.Error:
+            return 0
+
+    def _count_backends(self):
+        if self._monitor is None:
+            return None
+        try:
+            cur = self._monitor.cursor()
+            cur.execute(BACKENDS_QUERY)
+            count = cur.fetchall()[0][0]
+            self._monitor.rollback()
+            cur.close()
+            return count
+        except Exception:
+            # A failed query leaves the transaction aborted; later samples need it cleared
+            try:
+                self._monitor.rollback()
+            except Exception:
+                pass
+            return None
+
+    def _sample(self):
+        self._socket_samples.append(max(0, self._count_sockets() - self._baseline_sockets))
+        self._rss_peak = max(self._rss_peak, self._process.memory_info().rss)
+        backends = self._count_backends()
+        if backends is not None:
+            self._backend_samples.append(backends)
+
+    def _run_sampler(self):
+        while not self._stop.wait(self.sample_interval):
+            self._sample()
+
+    def start(self, server_stats=True):
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            self._alloc_start = tracemalloc.get_traced_memory()[0]
+        if server_stats and self.user_db is not None:
+            try:
+                # Separate monitoring session, excluded from its own count; it
+                # holds a governor permit but never waits for one
+                get_governor().acquire_direct_connection(self.user_db, Deadline(0))
+            except BudgetExhausted as e:
+                print(f"Resource monitor unavailable: {e}")
+            else:
+                try:
+                    self._monitor = open_connection(self.user_db)
+                except Exception as e:
+                    get_governor().release_direct_connection(self.user_db)
+                    print(f"Resource monitor unavailable: {e}")
+        self._rss_start = self._rss_peak = self._process.memory_info().rss
+        self._target = self._resolve_target()
+        self._baseline_sockets = self._count_sockets()
+        self._baseline_backends = self._count_backends()
+        self.started_at = time.monotonic()
+        self._sampler = threading.Thread(target=self._run_sampler, name="resource-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.stopped_at = time.monotonic()
+        self._sample()
+
+        self.alloc_net = self.alloc_peak = None
+        if self.trace_allocations and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.alloc_net = current - self._alloc_start
+            self.alloc_peak = peak - self._alloc_start
+            if self._started_tracing:
+                tracemalloc.stop()
+        if self._monitor is not None:
+            try:
+                self._monitor.close()
+            except Exception:
+                pass
+            self._monitor = None
+            get_governor().release_direct_connection(self.user_db)
+        return self.report()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def report(self):
+        mb = 1024 * 1024
+        wall = (self.stopped_at or time.monotonic()) - (self.started_at or time.monotonic())
+        rss_growth = (self._rss_peak - self._rss_start) / mb
+        alloc_peak = self.alloc_peak / mb if self.alloc_peak is not None else None
+        peak_backends = max(self._backend_samples) if self._backend_samples else None
+        return {
+            "wall_time_s": round(wall, 3),
+            "cpu_time_s": round(self.cpu_seconds, 4),
+            "cpu_percent": round(self.cpu_seconds / wall * 100, 2) if wall > 0 else 0,
+            "cpu_ms_per_task": round(self.cpu_seconds * 1000 / self.tasks, 3) if self.tasks else 0,
+            "python_alloc_net_mb": round(self.alloc_net / mb, 3) if self.alloc_net is not None else None,
+            "python_alloc_peak_mb": round(alloc_peak, 3) if alloc_peak is not None else None,
+            "rss_peak_growth_mb": round(rss_growth, 3),
+            # Traced allocations when available; RSS growth is much noisier
+            "memory_mb": round(alloc_peak if alloc_peak is not None else rss_growth, 3),
+            "client_sockets_baseline": self._baseline_sockets,
+            "client_sockets_peak": max(self._socket_samples) if self._socket_samples else 0,
+            "client_sockets_avg": round(
+                sum(self._socket_samples) / len(self._socket_samples), 2
+            ) if self._socket_samples else 0,
+            "server_backends_baseline": self._baseline_backends,
+            "server_backends_peak": peak_backends,
+            "server_backends_added": (
+                peak_backends - self._baseline_backends
+                if peak_backends is not None and self._baseline_backends is not None else None
+            ),
+        }
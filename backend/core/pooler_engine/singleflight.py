@@ -0,0 +1,68 @@
+# pooler_engine/singleflight.py
+
+"""
+Single-flight coalescing
+Concurrent callers asking for the same key share one execution: the first
+becomes the leader and runs it, the rest wait for the leader's outcome.
+"""
+
+import threading
+
+
+class _Flight:
+    __slots__ = ("done", "outcome", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.outcome = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates in-flight calls by key. Outcomes are shared as-is, so they
+    must be immutable.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, timeout=None):
+        """
+        Runs fn() unless a call for `key` is already in flight, in which case
+        waits up to `timeout` for its outcome. Returns (outcome, shared);
+        raises TimeoutError if a follower gives up waiting.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise TimeoutError("coalesced call did not finish in time")
+            if flight.error is not None:
+                raise flight.error
+            return flight.outcome, True
+
+        try:
+            flight.outcome = fn()
+            return flight.outcome, False
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,93 @@
+# pooler_engine/standin.py
+
+"""
+In-process Postgres stand-in
+A connection that speaks the slice of the psycopg2 API the pooler uses, with
+a configurable per-statement latency, so the pool can be benchmarked without
+a server. Cancelling a connection interrupts its running statement.
+"""
+
+import itertools
+import threading
+from types import SimpleNamespace
+from psycopg2 import extensions
+
+_backend_pids = itertools.count(1)
+
+
+class StandInCursor:
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.itersize = 2000
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, query, params=None):
+        conn = self.conn
+        conn.status = extensions.TRANSACTION_STATUS_INTRANS
+        if query.lstrip().upper().startswith("SET"):
+            return
+        conn._cancelled.clear()
+        if conn.latency and conn._cancelled.wait(conn.latency):
+            raise extensions.QueryCanceledError("canceling statement due to user request")
+        self._rows = list(conn.rows)
+        self.rowcount = len(self._rows)
+        self.description = [("column", 25)] if self._rows else None
+
+    def fetchmany(self, size=None):
+        size = size or self.itersize
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class StandInConnection:
+    """
+    Connection stand-in: every statement takes `latency` seconds and returns `rows`.
+    """
+    def __init__(self, latency=0.0, rows=((1,),)):
+        self.latency = latency
+        self.rows = rows
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self._cancelled = threading.Event()
+        self._pid = next(_backend_pids)
+
+    def cursor(self, name=None):
+        return StandInCursor(self, name)
+
+    def commit(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def get_backend_pid(self):
+        return self._pid
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def close(self):
+        self.closed = 1
+
+
+def standin_database(name="standin"):
+    """A UserDatabase-shaped target for pools that use stand-in connections."""
+    return SimpleNamespace(id=0, host=name, port=0, user_id=None, dbname=name)
+
+
+def standin_connect(latency=0.0, rows=((1,),)):
+    """Connection factory for ConnectionPooler(connect=...)."""
+    return lambda user_db: StandInConnection(latency, rows)
@@ -0,0 +1,112 @@
+# pooler_engine/sweep.py
+
+"""
+Pool-size sweep
+Runs the same workload across a grid (or a binary search) of pool sizes and
+queue limits, records throughput and p99 at each point, and recommends the
+configuration at the knee of the throughput curve.
+"""
+
+import threading
+import time
+from .pool_manager import ConnectionPooler
+
+_host_locks = {}
+_host_locks_guard = threading.Lock()
+
+
+def _host_lock(host_key):
+    """Sweeps against the same host are serialised so they can't skew each other."""
+    with _host_locks_guard:
+        return _host_locks.setdefault(host_key, threading.Lock())
+
+
+class PoolSweep:
+    """
+    Measures one workload at several pool configurations, one point at a time.
+    The knee is the smallest pool reaching `knee_fraction` of the best
+    throughput without dropping requests; points that failed requests are
+    never recommended, so a sweep where every point failed has no knee.
+    """
+    def __init__(self, user_db, statements, queue_timeout_ms,
+                 caller=None, knee_fraction=0.95, settle_seconds=0.5):
+        self.user_db = user_db
+        self.statements = statements
+        self.queue_timeout_ms = queue_timeout_ms
+        self.caller = caller
+        self.knee_fraction = knee_fraction
+        self.settle_seconds = settle_seconds
+        self.points = []
+
+    def measure(self, pool_size, queue_size):
+        config = {
+            "pool_size": pool_size,
+            "queue_size": queue_size,
+            "queue_timeout_ms": self.queue_timeout_ms,
+        }
+        pooler = ConnectionPooler(self.user_db, config)
+        # Every statement must reach the server, or pool size makes no difference
+        pooler.coalesce_reads = False
+        try:
+            # Warm the pool first so larger pools aren't charged for their handshakes
+            pooler.execute_statements(self.statements[:pool_size], caller=self.caller)
+            summary = pooler.execute_statements(self.statements, caller=self.caller)
+        finally:
+            pooler.shutdown()
+
+        elapsed_s = summary.get("total_execution_time_ms", 0) / 1000
+        point = {
+            **config,
+            "successful_requests": summary.get("successful_requests", 0),
+            "failed_requests": summary.get("failed_connections", 0),
+            "throughput_rps": round(summary.get("successful_requests", 0) / elapsed_s, 2)
+            if elapsed_s > 0 else 0,
+            "p99_ms": summary.get("request_latency_ms", {}).get("p99", 0),
+            "avg_queue_wait_ms": summary.get("avg_queue_wait_ms", 0),
+        }
+        self.points.append(point)
+        time.sleep(self.settle_seconds)
+        return point
+
+    def run_grid(self, pool_sizes, queue_sizes):
+        with _host_lock(f"{self.user_db.host}:{self.user_db.port}"):
+            for pool_size in pool_sizes:
+                for queue_size in queue_sizes:
+                    self.measure(pool_size, queue_size)
+        return self.result()
+
+    def run_binary(self, min_pool, max_pool, queue_size):
+        """
+        Binary search for the smallest pool size whose throughput is within
+        `knee_fraction` of the throughput at `max_pool`.
+        """
+        with _host_lock(f"{self.user_db.host}:{self.user_db.port}"):
+            target = self.measure(max_pool, queue_size)["throughput_rps"] * self.knee_fraction
+            low, high = min_pool, max_pool
+            while low < high:
+                mid = (low + high) // 2
+                if self.measure(mid, queue_size)["throughput_rps"] >= target:
+                    high = mid
+                else:
+                    low = mid + 1
+        return self.result()
+
+    def knee(self):
+        clean = [p for p in self.points if p["failed_requests"] == 0]
+        if not clean:
+            return None
+        best = max(p["throughput_rps"] for p in clean)
+        candidates = [p for p in clean if p["throughput_rps"] >= best * self.knee_fraction]
+        return min(candidates, key=lambda p: (p["pool_size"], p["p99_ms"], p["queue_size"]))
+
+    def result(self):
+        knee = self.knee()
+        return {
+            "points": sorted(self.points, key=lambda p: (p["pool_size"], p["queue_size"])),
+            "knee": knee,
+            "recommended_config": {
+                "pool_size": knee["pool_size"],
+                "queue_size": knee["queue_size"],
+                "queue_timeout_ms": self.queue_timeout_ms,
+            } if knee else None,
+        }
@@ -0,0 +1,116 @@
+# pooler_engine/tracing.py
+
+"""
+Request phase tracing
+Records monotonic timestamps as a request moves through its phases
+(queue, connect, execute, fetch, release) and exports sampled traces.
+"""
+
+import random
+import threading
+import time
+
+PHASES = ("queue", "connect", "execute", "fetch", "release")
+
+
+class RequestTrace:
+    """
+    Sequential phase marks for one request.
+    Entering a phase closes the previous one, so each mark is a single timestamp;
+    entering the phase already open is a no-op.
+    """
+    __slots__ = ("request_id", "marks", "thread_id", "finished_at")
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+        self.marks = [("queue", time.perf_counter())]
+        self.thread_id = None
+        self.finished_at = None
+
+    def enter(self, phase):
+        if self.marks[-1][0] != phase:
+            self.marks.append((phase, time.perf_counter()))
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+        self.thread_id = threading.get_native_id()
+
+    def spans(self):
+        """Returns (phase, start, end) tuples for every completed phase."""
+        if self.finished_at is None:
+            return []
+        ends = [t for _, t in self.marks[1:]] + [self.finished_at]
+        return [(phase, start, end) for (phase, start), end in zip(self.marks, ends)]
+
+    def durations_ms(self):
+        durations = {}
+        for phase, start, end in self.spans():
+            durations[phase] = durations.get(phase, 0) + (end - start) * 1000
+        return durations
+
+
+class TraceCollector:
+    """
+    Keeps a random sample of finished traces from one run, up to `max_traces`.
+    """
+    def __init__(self, sample_rate, max_traces):
+        self.sample_rate = sample_rate
+        self.max_traces = max_traces
+        self.origin = time.perf_counter()
+        self.traces = []
+        self._lock = threading.Lock()
+
+    def offer(self, trace):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+        with self._lock:
+            if len(self.traces) < self.max_traces:
+                self.traces.append(trace)
+
+    def _offset_ms(self, t):
+        return round((t - self.origin) * 1000, 3)
+
+    def as_json(self):
+        with self._lock:
+            traces = list(self.traces)
+        return [
+            {
+                "request_id": trace.request_id,
+                "thread_id": trace.thread_id,
+                "phases": [
+                    {
+                        "phase": phase,
+                        "start_ms": self._offset_ms(start),
+                        "duration_ms": round((end - start) * 1000, 3),
+                    }
+                    for phase, start, end in trace.spans()
+                ],
+            }
+            for trace in traces
+        ]
+
+    def as_chrome_trace(self):
+        """
+        Chrome trace event format, loadable in chrome://tracing or Perfetto.
+        """
+        with self._lock:
+            traces = list(self.traces)
+        events = []
+        for trace in traces:
+            for phase, start, end in trace.spans():
+                events.append({
+                    "name": phase,
+                    "cat": "pooler",
+                    "ph": "X",
+                    "ts": round((start - self.origin) * 1_000_000, 1),
+                    "dur": round((end - start) * 1_000_000, 1),
+                    "pid": 1,
+                    "tid": trace.thread_id,
+                    "args": {"request_id": trace.request_id},
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, fmt="json"):
+        if fmt == "chrome":
+            return self.as_chrome_trace()
+        return self.as_json()
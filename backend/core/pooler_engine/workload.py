@@ -0,0 +1,180 @@
+# pooler_engine/workload.py
+
+"""
+Weighted workload mixes
+Validates saved workload definitions once (cached), and pre-generates the
+statement stream for a run so parameter generation never lands inside the
+measured latencies.
+
+A definition is a list of statements (`read_only` defaults to false; only
+statements marked read-only may be coalesced or hedged by the pool):
+    {
+        "sql": "SELECT * FROM orders WHERE id = %(id)s",
+        "weight": 3,
+        "read_only": true,
+        "params": {"id": {"type": "int", "min": 1, "max": 10000}}
+    }
+"""
+
+import bisect
+import json
+import random
+import re
+import string
+from functools import lru_cache
+from .fingerprint import fingerprint
+
+_NAMED_PLACEHOLDER = re.compile(r"%\((\w+)\)s")
+
+GENERATOR_TYPES = ("int", "float", "choice", "text", "const")
+
+# Fixed query run by the test, compare and sweep pages and the benchmark
+# command when no saved workload is given
+TEST_QUERY = """
+    SELECT 
+        schemaname, tablename, tableowner,
+        tablespace, hasindexes, hasrules 
+    FROM pg_tables 
+    WHERE schemaname NOT IN ('information_schema', 'pg_catalog')
+    LIMIT 15;
+"""
+
+
+class WorkloadError(ValueError):
+    """
+    Raised when a workload definition is invalid.
+    """
+
+
+def _check_generator(name, spec):
+    if not isinstance(spec, dict) or spec.get("type") not in GENERATOR_TYPES:
+        raise WorkloadError(
+            f"Parameter '{name}' needs a type, one of: {', '.join(GENERATOR_TYPES)}"
+        )
+    kind = spec["type"]
+    if kind in ("int", "float"):
+        low, high = spec.get("min", 0), spec.get("max")
+        if not isinstance(low, (int, float)) or not isinstance(high, (int, float)) or low > high:
+            raise WorkloadError(f"Parameter '{name}' needs numeric min <= max")
+    elif kind == "choice":
+        if not isinstance(spec.get("values"), list) or not spec["values"]:
+            raise WorkloadError(f"Parameter '{name}' needs a non-empty list of values")
+    elif kind == "text":
+        if not isinstance(spec.get("length", 8), int) or spec.get("length", 8) < 1:
+            raise WorkloadError(f"Parameter '{name}' needs a positive length")
+    elif "value" not in spec:
+        raise WorkloadError(f"Parameter '{name}' needs a value")
+
+
+def _generator(spec):
+    kind = spec["type"]
+    if kind == "int":
+        low, high = int(spec.get("min", 0)), int(spec["max"])
+        return lambda rng: rng.randint(low, high)
+    if kind == "float":
+        low, high = float(spec.get("min", 0)), float(spec["max"])
+        return lambda rng: rng.uniform(low, high)
+    if kind == "choice":
+        values = list(spec["values"])
+        return lambda rng: rng.choice(values)
+    if kind == "text":
+        length = spec.get("length", 8)
+        return lambda rng: "".join(rng.choices(string.ascii_lowercase, k=length))
+    value = spec["value"]
+    return lambda rng: value
+
+
+class CompiledStatement:
+    __slots__ = ("sql", "weight", "read_only", "statement_type", "generators")
+
+    def __init__(self, sql, weight, read_only, statement_type, generators):
+        self.sql = sql
+        self.weight = weight
+        self.read_only = read_only
+        self.statement_type = statement_type
+        self.generators = generators
+
+    def params(self, rng):
+        if not self.generators:
+            return None
+        return {name: generate(rng) for name, generate in self.generators}
+
+
+class CompiledWorkload:
+    """
+    A validated workload, ready to generate statement streams.
+    """
+    def __init__(self, statements):
+        self.statements = statements
+        self._cumulative = []
+        total = 0
+        for statement in statements:
+            total += statement.weight
+            self._cumulative.append(total)
+        self.total_weight = total
+
+    def generate(self, count, seed=None):
+        """
+        Returns `count` (sql, params, read_only) triples drawn by weight.
+        """
+        rng = random.Random(seed)
+        stream = []
+        for _ in range(count):
+            pick = rng.random() * self.total_weight
+            statement = self.statements[bisect.bisect_right(self._cumulative, pick)]
+            stream.append((statement.sql, statement.params(rng), statement.read_only))
+        return stream
+
+
+@lru_cache(maxsize=256)
+def _compile(definition_json):
+    definition = json.loads(definition_json)
+    if not isinstance(definition, list) or not definition:
+        raise WorkloadError("A workload needs at least one statement")
+
+    statements = []
+    for index, item in enumerate(definition):
+        if not isinstance(item, dict) or not str(item.get("sql", "")).strip():
+            raise WorkloadError(f"Statement {index} needs a sql string")
+        sql = item["sql"]
+        weight = item.get("weight", 1)
+        if not isinstance(weight, (int, float)) or weight <= 0:
+            raise WorkloadError(f"Statement {index} needs a positive weight")
+
+        fp = fingerprint(sql)
+        statement_type = fp.statement_type
+        # A SELECT can still write (nextval, volatile functions), so never inferred
+        read_only = bool(item.get("read_only", False))
+        if read_only and statement_type != "SELECT":
+            raise WorkloadError(
+                f"Statement {index} is marked read_only but is a {statement_type}"
+            )
+        if read_only and fp.statement_count != 1:
+            raise WorkloadError(
+                f"Statement {index} is marked read_only but holds {fp.statement_count} statements"
+            )
+
+        params = item.get("params") or {}
+        if not isinstance(params, dict):
+            raise WorkloadError(f"Statement {index} params must be an object")
+        missing = set(_NAMED_PLACEHOLDER.findall(sql)) - set(params)
+        if missing:
+            raise WorkloadError(
+                f"Statement {index} has no generator for: {', '.join(sorted(missing))}"
+            )
+        for name, spec in params.items():
+            _check_generator(name, spec)
+
+        generators = tuple((name, _generator(spec)) for name, spec in sorted(params.items()))
+        statements.append(
+            CompiledStatement(sql, weight, read_only, statement_type, generators)
+        )
+    return CompiledWorkload(statements)
+
+
+def compile_workload(definition):
+    """
+    Validates and compiles a workload definition.
+    Results are cached by definition, so repeat runs skip parsing entirely.
+    """
+    return _compile(json.dumps(definition, sort_keys=True))
@@ -0,0 +1,36 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from .pooler_engine.columnar import ColumnarResult
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Query results as one JSON array per column, plus the column schema.
+    """
+    media_type = "application/vnd.pcsaver.columnar+json"
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        data = dict(data or {})
+        if isinstance(data.get("data"), ColumnarResult):
+            data["data"] = data["data"].to_json()
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class ColumnarBinaryRenderer(BaseRenderer):
+    """
+    Query results in the length-prefixed columnar layout (see pooler_engine/columnar.py).
+    Anything that isn't a result, such as an error, falls back to JSON.
+    """
+    media_type = "application/vnd.pcsaver.columnar"
+    format = "columnar-binary"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        result = (data or {}).get("data") if isinstance(data, dict) else None
+        if isinstance(result, ColumnarResult):
+            return result.to_bytes()
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            response["Content-Type"] = JSONRenderer.media_type
+        return JSONRenderer().render(data)
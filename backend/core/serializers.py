@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import UserDatabase, PoolerConfig
+from .models import UserDatabase, PoolerConfig, Workload
+from .pooler_engine.workload import compile_workload, WorkloadError
 
 User = get_user_model()
 
@@ -89,6 +90,20 @@ class UserDatabaseSerializer(serializers.ModelSerializer):
         return instance
 
 
+class WorkloadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Workload
+        fields = ["id", "name", "statements", "created_at", "updated_at"]
+        read_only_fields = ["id", "created_at", "updated_at"]
+
+    def validate_statements(self, value):
+        try:
+            compile_workload(value)
+        except WorkloadError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+
 # class TestResultSerializer(serializers.ModelSerializer):
 #     user_db_name = serializers.CharField(source='user_db.dbname', read_only=True)
     
@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .authentication import get_user_cache
+from .models import PoolerConfig, UserDatabase, User
+from .stats import POOL_FIELDS, get_public_stats
+
+
+def _adjust_on_commit(**changes):
+    # Rolled-back writes never reach the running totals
+    transaction.on_commit(lambda: get_public_stats().adjust(**changes))
+
+
+def _evict_cached_user(user_id):
+    # Covers saves made outside the views (admin, shell), e.g. deactivation
+    transaction.on_commit(lambda: get_user_cache().invalidate(user_id))
+
+
+def _bump_databases_version(user_id):
+    # Queryset update: skips User signals and leaves cached auth users alone
+    User.objects.filter(pk=user_id).update(
+        databases_version=F("databases_version") + 1,
+        databases_changed_at=timezone.now(),
+    )
+
+
+def _bump_for_pool_config(instance):
+    user_id = (
+        UserDatabase.objects.filter(pk=instance.user_db_id)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    # Already gone when removed by the parent database's cascade
+    if user_id is not None:
+        _bump_databases_version(user_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    _evict_cached_user(instance.pk)
+    if created:
+        _adjust_on_commit(users=1)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    _evict_cached_user(instance.pk)
+    _adjust_on_commit(users=-1)
+
+
+@receiver(post_save, sender=UserDatabase)
+def database_saved(sender, instance, created, **kwargs):
+    _bump_databases_version(instance.user_id)
+    if created:
+        _adjust_on_commit(databases=1)
+
+
+@receiver(post_delete, sender=UserDatabase)
+def database_deleted(sender, instance, **kwargs):
+    _bump_databases_version(instance.user_id)
+    _adjust_on_commit(databases=-1)
+
+
+@receiver(post_init, sender=PoolerConfig)
+def pool_config_loaded(sender, instance, **kwargs):
+    # Remember the stored values so a later save can apply just the difference
+    instance._stats_values = {field: getattr(instance, field) for field in POOL_FIELDS}
+
+
+@receiver(post_save, sender=PoolerConfig)
+def pool_config_saved(sender, instance, created, **kwargs):
+    current = {field: getattr(instance, field) for field in POOL_FIELDS}
+    previous = {} if created else instance._stats_values
+    _adjust_on_commit(
+        pool_configs=1 if created else 0,
+        pool_deltas={field: current[field] - previous.get(field, 0) for field in POOL_FIELDS},
+    )
+    instance._stats_values = current
+    _bump_for_pool_config(instance)
+
+
+@receiver(post_delete, sender=PoolerConfig)
+def pool_config_deleted(sender, instance, **kwargs):
+    _bump_for_pool_config(instance)
+    _adjust_on_commit(
+        pool_configs=-1,
+        pool_deltas={field: -instance._stats_values[field] for field in POOL_FIELDS},
+    )
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from django.db.models import Count, Sum
+from .models import PoolerConfig, UserDatabase, User
+
+POOL_FIELDS = ("pool_size", "queue_size", "queue_timeout_ms")
+
+DEFAULT_PUBLIC_STATS = {
+    # Full recount interval; corrects drift from writes made by other processes
+    "resync_seconds": 300,
+}
+
+
+class PublicStats:
+    """
+    Running counts and sums behind the public stats endpoint, kept current by
+    model signals. Reads cost O(1); the rendered payload and its ETag are
+    rebuilt only after a change.
+    """
+    def __init__(self, resync_seconds):
+        self.resync_seconds = resync_seconds
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._snapshot = None
+        self.users = 0
+        self.databases = 0
+        self.pool_configs = 0
+        self.pool_sums = dict.fromkeys(POOL_FIELDS, 0)
+
+    def _load(self):
+        # Called with the lock held
+        self.users = User.objects.count()
+        self.databases = UserDatabase.objects.count()
+        totals = PoolerConfig.objects.aggregate(
+            count=Count("id"), **{field: Sum(field) for field in POOL_FIELDS}
+        )
+        self.pool_configs = totals["count"]
+        self.pool_sums = {field: totals[field] or 0 for field in POOL_FIELDS}
+        self._loaded_at = time.monotonic()
+        self._snapshot = None
+
+    def adjust(self, users=0, databases=0, pool_configs=0, pool_deltas=None):
+        with self._lock:
+            if self._loaded_at is None:
+                # Nothing cached yet; the first read counts from the tables
+                return
+            self.users += users
+            self.databases += databases
+            self.pool_configs += pool_configs
+            for field, delta in (pool_deltas or {}).items():
+                self.pool_sums[field] += delta
+            self._snapshot = None
+
+    def _average(self, field):
+        return round(self.pool_sums[field] / self.pool_configs, 2) if self.pool_configs else 0
+
+    def snapshot(self):
+        """Returns (data, etag) for the current figures."""
+        with self._lock:
+            if (self._loaded_at is None
+                    or time.monotonic() - self._loaded_at > self.resync_seconds):
+                self._load()
+            if self._snapshot is None:
+                data = {
+                    "users_registered": self.users,
+                    "databases_connected": self.databases,
+                    "avg_pool_size": self._average("pool_size"),
+                    "avg_queue_size": self._average("queue_size"),
+                    "avg_timeout_ms": self._average("queue_timeout_ms"),
+                }
+                digest = hashlib.md5(
+                    json.dumps(data, sort_keys=True).encode()
+                ).hexdigest()
+                self._snapshot = (data, f'"{digest}"')
+            return self._snapshot
+
+
+_public_stats = None
+_public_stats_lock = threading.Lock()
+
+
+def get_public_stats():
+    global _public_stats
+    if _public_stats is None:
+        with _public_stats_lock:
+            if _public_stats is None:
+                config = {**DEFAULT_PUBLIC_STATS, **getattr(settings, "PUBLIC_STATS", {})}
+                _public_stats = PublicStats(config["resync_seconds"])
+    return _public_stats
@@ -1,3 +1,874 @@
-from django.test import TestCase
+import struct
+import random
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+from django.utils.http import http_date, urlsafe_base64_encode
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from .pooler_engine.abtest import mann_whitney_u, median_ci
+from .pooler_engine.admission import CoDelController
+from .pooler_engine.buffering import MemoryBudget, ResultBuffer
+from . import signals, views
+from .authentication import TOKEN_VERSION_CLAIM, CachedJWTAuthentication, UserCache
+from .pooler_engine import columnar, perfsuite
+from .pooler_engine.capture import CaptureWriter, TraceReplayer, read_events, trace_files
+from .pooler_engine.context import Deadline, RequestContext
+from .pooler_engine.executor import ExecutorRejected, ExecutorService
+from .pooler_engine.fingerprint import StatementStats
+from .pooler_engine.governor import ConnectionGovernor, FairSemaphore
+from .pooler_engine.hedging import Hedger
+from .pooler_engine.metrics import MetricsRecorder
+from .pooler_engine.pool_manager import ConnectionPooler
+from .pooler_engine.standin import StandInConnection, standin_connect, standin_database
+from .pooler_engine.sweep import PoolSweep
+from .pooler_engine.workload import WorkloadError, compile_workload
+from .stats import PublicStats
+from .pooler_engine.db_client import _fetch_buffered, run_query
 
-# Create your tests here.
+
+class ListCursor:
+    """Cursor stand-in that serves fixed rows and counts FETCH round trips."""
+    def __init__(self, rows, fail_after=None):
+        self.rows = list(rows)
+        self.fail_after = fail_after
+        self.fetches = 0
+        self.description = (("id", 23),)
+
+    def fetchmany(self, size):
+        if self.fail_after is not None and self.fetches >= self.fail_after:
+            raise RuntimeError("canceling statement due to statement timeout")
+        self.fetches += 1
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+class RecordingPooler:
+    """Pool stand-in that records the statements it was asked to run."""
+    def __init__(self):
+        self.executed = []
+
+    def execute_one(self, query, params=None, metrics=None):
+        self.executed.append((query, params))
+        return None
+
+
+class ExecutorServiceTests(SimpleTestCase):
+    def service(self, max_pending, max_pending_per_caller, submit_timeout_s):
+        service = ExecutorService(4, max_pending, max_pending_per_caller, submit_timeout_s)
+        gate = threading.Event()
+        self.addCleanup(service._executor.shutdown)
+        self.addCleanup(gate.set)
+        return service, gate
+
+    def test_rejects_after_submit_timeout(self):
+        service, gate = self.service(1, 1, 0.05)
+        service.submit("a", gate.wait)
+        started = time.monotonic()
+        with self.assertRaises(ExecutorRejected):
+            service.submit("b", gate.wait)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        with self.assertRaises(ExecutorRejected):
+            service.submit("b", gate.wait, block=False)
+        self.assertEqual(service.usage("b")["rejected"], 2)
+
+    def test_waits_for_room_within_submit_timeout(self):
+        service, gate = self.service(1, 1, 2)
+        service.submit("a", gate.wait)
+        threading.Timer(0.05, gate.set).start()
+        self.assertTrue(service.submit("b", lambda: True).result(timeout=2))
+
+    def test_per_caller_limit_leaves_room_for_others(self):
+        service, gate = self.service(10, 2, 0.01)
+        for _ in range(2):
+            service.submit("busy", gate.wait)
+        with self.assertRaises(ExecutorRejected):
+            service.submit("busy", gate.wait)
+        future = service.submit("other", lambda: "ran")
+        self.assertEqual(future.result(timeout=2), "ran")
+        usage = service.usage("busy")
+        self.assertEqual((usage["submitted"], usage["pending"], usage["rejected"]), (2, 2, 1))
+
+
+class ResultBufferTests(SimpleTestCase):
+    def setUp(self):
+        self.spill_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spill_dir.cleanup)
+        self.budget = MemoryBudget(1 << 20)
+
+    def buffer(self, request_budget):
+        return ResultBuffer(request_budget, self.budget, self.spill_dir.name)
+
+    def test_in_memory_round_trip_releases_budget(self):
+        result = self.buffer(1 << 20)
+        result.extend([(1, "a"), (2, "b")])
+        result.finish()
+        self.assertFalse(result.spilled)
+        self.assertEqual(list(result), [(1, "a"), (2, "b")])
+        self.assertGreater(self.budget.in_use, 0)
+        result.close()
+        self.assertEqual(self.budget.in_use, 0)
+
+    def test_spilled_rows_read_back_in_order(self):
+        rows = [(i, f"row {i}") for i in range(500)]
+        result = self.buffer(256)
+        for start in range(0, len(rows), 100):
+            result.extend(rows[start:start + 100])
+        result.finish()
+        self.assertTrue(result.spilled)
+        self.assertEqual(len(result), 500)
+        self.assertEqual(list(result), rows)
+        self.assertEqual(result[-1], rows[-1])
+        self.assertEqual(result[10:13], rows[10:13])
+        self.assertEqual(self.budget.stats()["spilled_results"], 1)
+        result.close()
+        self.assertEqual(self.budget.in_use, 0)
+
+    def test_close_before_finish_releases_budget(self):
+        result = self.buffer(1 << 20)
+        result.extend([(1,), (2,)])
+        self.assertGreater(self.budget.in_use, 0)
+        result.close()
+        result.close()
+        self.assertEqual(self.budget.in_use, 0)
+
+
+class FetchBufferedTests(SimpleTestCase):
+    def test_short_batch_ends_the_fetch(self):
+        cursor = ListCursor([(i,) for i in range(25)])
+        with _fetch_buffered(cursor, 10) as result:
+            self.assertEqual(len(result), 25)
+        self.assertEqual(cursor.fetches, 3)
+
+    def test_failed_fetch_returns_reserved_budget(self):
+        budget = MemoryBudget(1 << 20)
+        cursor = ListCursor([(i,) for i in range(25)], fail_after=1)
+        with mock.patch("core.pooler_engine.buffering.get_memory_budget", return_value=budget):
+            with self.assertRaises(RuntimeError):
+                _fetch_buffered(cursor, 10)
+        self.assertEqual(budget.in_use, 0)
+
+
+class CaptureTests(SimpleTestCase):
+    def test_offsets_survive_rotation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Room for the 16-byte header only, so each event lands in its own file
+            writer = CaptureWriter(directory, "db1-t", max_bytes=17, max_files=8)
+            for second in range(3):
+                writer.record(writer.started + second, 7, 1.5, "SELECT %s", [second])
+            writer.close()
+            paths = trace_files(directory, "db1-t")
+            self.assertEqual(len(paths), 3)
+            events = read_events(paths)
+        self.assertEqual([round(event[0], 6) for event in events], [0, 1, 2])
+        self.assertEqual([event[5] for event in events], [[0], [1], [2]])
+
+    def test_same_name_gets_a_fresh_trace(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = CaptureWriter(directory, "db1-t", max_bytes=1 << 20, max_files=8)
+            second = CaptureWriter(directory, "db1-t", max_bytes=1 << 20, max_files=8)
+            first.record(first.started, 1, 1.0, "SELECT 1")
+            second.record(second.started, 2, 1.0, "SELECT 2")
+            first.close()
+            second.close()
+            self.assertEqual(second.name, "db1-t-2")
+            self.assertEqual([event[4] for event in read_events(trace_files(directory, "db1-t"))],
+                             ["SELECT 1"])
+            self.assertEqual([event[4] for event in read_events(trace_files(directory, "db1-t-2"))],
+                             ["SELECT 2"])
+
+
+class TraceReplayerTests(SimpleTestCase):
+    def events(self, sessions, per_session):
+        return sorted(
+            (step * 0.001, session, 1.0, False, "SELECT %s", [session, step])
+            for session in range(sessions) for step in range(per_session)
+        )
+
+    def test_sessions_keep_statement_order(self):
+        pooler = RecordingPooler()
+        summary = TraceReplayer(pooler, self.events(5, 4), speed=None).run()
+        self.assertEqual(summary["failed"], 0)
+        self.assertEqual(len(pooler.executed), 20)
+        for session in range(5):
+            steps = [params[1] for _, params in pooler.executed if params[0] == session]
+            self.assertEqual(steps, [0, 1, 2, 3])
+
+    def test_rejected_statements_are_counted(self):
+        executor = mock.Mock()
+        executor.submit.side_effect = ExecutorRejected("executor busy")
+        with mock.patch("core.pooler_engine.capture.get_executor", return_value=executor):
+            summary = TraceReplayer(RecordingPooler(), self.events(3, 2), speed=None).run()
+        self.assertEqual(summary["rejected"], 6)
+        self.assertEqual(summary["failed"], 6)
+
+    def test_captured_and_replayed_latency_cover_the_same_span(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pooler = ConnectionPooler(
+                standin_database("replay"),
+                {"pool_size": 1, "queue_size": 20, "queue_timeout_ms": 2000},
+                connect=standin_connect(0.02),
+            )
+            pooler.coalesce_reads = False
+            self.addCleanup(pooler.shutdown)
+            config = {"directory": directory, "max_bytes": 1 << 20, "max_files": 4}
+            with mock.patch("core.pooler_engine.pool_manager.get_engine_config", return_value=config):
+                writer = pooler.start_capture("db1-latency")
+            # One connection, four concurrent statements: three of them queue
+            pooler.execute_statements([("SELECT 1", None, False)] * 4)
+            pooler.stop_capture()
+            events = read_events(trace_files(directory, writer.name))
+        self.assertEqual(len(events), 4)
+        self.assertGreater(max(event[2] for event in events), 50)
+
+
+class ExecuteStatementsTests(SimpleTestCase):
+    def test_cancelled_request_counts_as_a_failure(self):
+        pooler = ConnectionPooler(
+            standin_database("late"),
+            {"pool_size": 1, "queue_size": 10, "queue_timeout_ms": 50},
+            connect=standin_connect(0.0),
+        )
+        self.addCleanup(pooler.shutdown)
+        pooler.statement_timeout = pooler.cancel_grace = 0
+
+        def late_success(query, params, ctx, collector=None, read_only=False):
+            time.sleep(0.2)
+            ctx.metrics.increment_success()
+
+        pooler._execute_query = late_success
+        summary = pooler.execute_statements([("SELECT 1", None, False)])
+        self.assertEqual(summary["successful_requests"], 0)
+        self.assertEqual(summary["failed_connections"], 1)
+        self.assertEqual(summary["cancelled_requests"], 1)
+
+
+class DeadlineTests(SimpleTestCase):
+    def pool(self, latency):
+        connections = []
+
+        def connect(user_db):
+            connections.append(StandInConnection(latency))
+            return connections[-1]
+
+        pooler = ConnectionPooler(
+            standin_database("deadline"),
+            {"pool_size": 1, "queue_size": 10, "queue_timeout_ms": 5000},
+            connect=connect,
+        )
+        pooler.coalesce_reads = False
+        self.addCleanup(pooler.shutdown)
+        return pooler, connections
+
+    def run_in_thread(self, pooler, ctx):
+        outcome = []
+        worker = threading.Thread(
+            target=lambda: outcome.append(pooler._execute_query("SELECT 1", None, ctx))
+        )
+        worker.start()
+        return worker, outcome
+
+    def test_queued_request_gives_up_at_its_deadline(self):
+        pooler, _ = self.pool(0.5)
+        holder, _ = self.run_in_thread(pooler, RequestContext(Deadline(5), MetricsRecorder()))
+        while pooler.active_connections == 0:
+            time.sleep(0.001)
+        started = time.monotonic()
+        outcome = pooler._execute_query("SELECT 1", None, RequestContext(Deadline(0.05), MetricsRecorder()))
+        self.assertEqual(outcome, "try again later - deadline exceeded")
+        self.assertLess(time.monotonic() - started, 0.4)
+        holder.join()
+
+    def test_cancel_stops_the_statement_and_discards_the_connection(self):
+        pooler, connections = self.pool(5)
+        ctx = RequestContext(Deadline(10), MetricsRecorder())
+        worker, outcome = self.run_in_thread(pooler, ctx)
+        while ctx._connection is None:
+            time.sleep(0.001)
+        # Let the statement itself start; a cancel between statements is a no-op
+        time.sleep(0.1)
+        ctx.cancel()
+        worker.join(timeout=2)
+        self.assertFalse(worker.is_alive())
+        self.assertIn("canceling statement", outcome[0])
+        self.assertTrue(connections[0].closed)
+        self.assertEqual(pooler.open_connections, 0)
+        self.assertEqual(len(pooler.idle_connections), 0)
+
+
+class AdmissionTests(SimpleTestCase):
+    def test_standing_queue_cuts_the_wait_to_the_target(self):
+        codel = CoDelController(target_ms=5, interval_ms=20)
+        self.assertEqual(codel.max_wait(1.0, waiting=3), 1.0)
+        # Every request in the interval waited past the target
+        codel.record_sojourn(0.05, waiting=3)
+        time.sleep(0.03)
+        codel.record_sojourn(0.04, waiting=3)
+        self.assertTrue(codel.overloaded)
+        self.assertEqual(codel.max_wait(1.0, waiting=3), 0.005)
+        # One quick slot in the next interval means the queue drained
+        codel.record_sojourn(0, waiting=0)
+        time.sleep(0.03)
+        self.assertEqual(codel.max_wait(1.0), 1.0)
+
+    def test_burst_shorter_than_the_interval_is_absorbed(self):
+        codel = CoDelController(target_ms=5, interval_ms=20)
+        codel.record_sojourn(0.05, waiting=3)
+        codel.record_sojourn(0, waiting=2)
+        time.sleep(0.03)
+        self.assertEqual(codel.max_wait(1.0, waiting=2), 1.0)
+
+    def test_pool_sheds_under_overload(self):
+        pooler = ConnectionPooler(
+            standin_database("codel"),
+            {"pool_size": 1, "queue_size": 100, "queue_timeout_ms": 10000},
+            connect=standin_connect(0.01),
+        )
+        pooler.coalesce_reads = False
+        pooler.admission = CoDelController(target_ms=5, interval_ms=20)
+        self.addCleanup(pooler.shutdown)
+        summary = pooler.execute_statements([("SELECT 1", None, False)] * 60)
+        self.assertGreater(summary["shed_requests"], 0)
+        self.assertGreater(summary["successful_requests"], 0)
+        self.assertEqual(summary["successful_requests"] + summary["failed_connections"], 60)
+
+
+class CoalescingTests(SimpleTestCase):
+    def coalesced(self, query, read_only):
+        pooler = ConnectionPooler(
+            standin_database("coalescing"),
+            {"pool_size": 2, "queue_size": 50, "queue_timeout_ms": 2000},
+            connect=standin_connect(0.05),
+        )
+        try:
+            summary = pooler.execute_statements([(query, None, read_only)] * 8)
+        finally:
+            pooler.shutdown()
+        self.assertEqual(summary["successful_requests"], 8)
+        return summary["coalesced_requests"]
+
+    def test_flagged_single_select_is_coalesced(self):
+        self.assertGreater(self.coalesced("SELECT 1", True), 0)
+
+    def test_unflagged_select_is_not_coalesced(self):
+        self.assertEqual(self.coalesced("SELECT nextval('ids')", False), 0)
+
+    def test_multi_statement_is_not_coalesced(self):
+        self.assertEqual(self.coalesced("SELECT 1; UPDATE t SET a = 1", True), 0)
+
+
+class HedgingTests(SimpleTestCase):
+    def hedged(self, query, read_only):
+        pooler = ConnectionPooler(
+            standin_database("hedging"),
+            {"pool_size": 4, "queue_size": 50, "queue_timeout_ms": 2000},
+            connect=standin_connect(0.02),
+        )
+        pooler.coalesce_reads = False
+        # No warm-up and a full budget: every eligible read is hedged straight away
+        pooler.hedger = Hedger(50, 100, 0, enabled=True)
+        try:
+            summary = pooler.execute_statements([(query, None, read_only)] * 4)
+        finally:
+            pooler.shutdown()
+        self.summary = summary
+        return summary["hedged_requests"]
+
+    def test_flagged_read_is_hedged(self):
+        hedged = self.hedged("SELECT 1", True)
+        self.assertGreater(hedged, 0)
+        # Hedge attempts add their phases, but not another request latency
+        phases = self.summary["phase_breakdown_ms"]
+        self.assertEqual(self.summary["request_latency_ms"]["count"], 4)
+        self.assertEqual(phases["queue"]["count"], 4 + hedged)
+
+    def test_release_is_one_span(self):
+        pooler = ConnectionPooler(
+            standin_database("release"),
+            {"pool_size": 1, "queue_size": 10, "queue_timeout_ms": 1000},
+            connect=standin_connect(0.0),
+        )
+        self.addCleanup(pooler.shutdown)
+        ctx = RequestContext(Deadline(1), MetricsRecorder())
+        pooler._execute_query("SELECT 1", None, ctx)
+        phases = [phase for phase, _ in ctx.trace.marks]
+        self.assertEqual(phases.count("release"), 1)
+
+    def test_multi_statement_is_never_hedged(self):
+        self.assertEqual(self.hedged("SELECT 1; UPDATE t SET a = 1", True), 0)
+
+
+class IdleTimeoutTests(SimpleTestCase):
+    def test_idle_connections_are_closed(self):
+        pooler = ConnectionPooler(
+            standin_database("idle"),
+            {"pool_size": 3, "queue_size": 10, "queue_timeout_ms": 1000},
+            connect=standin_connect(0.01),
+        )
+        pooler.coalesce_reads = False
+        try:
+            pooler.execute_statements([("SELECT 1", None, True)] * 6)
+            self.assertGreater(pooler.open_connections, 0)
+            pooler.idle_timeout = 60
+            pooler.close_idle()
+            self.assertGreater(pooler.open_connections, 0)
+            pooler.idle_timeout = 0.001
+            time.sleep(0.01)
+            pooler.close_idle()
+            self.assertEqual(pooler.open_connections, 0)
+            self.assertEqual(len(pooler.idle_connections), 0)
+        finally:
+            pooler.shutdown()
+
+
+class WorkloadTests(SimpleTestCase):
+    def test_read_only_is_never_inferred(self):
+        workload = compile_workload([{"sql": "SELECT nextval('ids')"}])
+        self.assertEqual(workload.generate(1), [("SELECT nextval('ids')", None, False)])
+
+    def test_read_only_needs_a_single_select(self):
+        with self.assertRaises(WorkloadError):
+            compile_workload([{"sql": "SELECT 1; UPDATE t SET a = 1", "read_only": True}])
+
+
+class StatementStatsTests(SimpleTestCase):
+    def test_newcomer_inherits_the_victims_total(self):
+        stats = StatementStats(max_entries=2)
+        stats.record("SELECT a FROM t", 100)
+        stats.record("SELECT b FROM t", 10)
+        stats.record("SELECT c FROM t", 5)
+        stats.record("SELECT d FROM t", 1)
+        entries = {entry["query"]: entry for entry in stats.top()}
+        self.assertEqual(set(entries), {"SELECT a FROM t", "SELECT d FROM t"})
+        # c took over b's 10 ms, so d (the lightest) replaced c, not the other way round
+        self.assertEqual(entries["SELECT d FROM t"]["total_time_error_ms"], 15)
+        self.assertEqual(stats.evicted, 2)
+
+
+class FairSemaphoreTests(SimpleTestCase):
+    def test_permits_go_to_waiters_in_arrival_order(self):
+        semaphore = FairSemaphore(1)
+        self.assertTrue(semaphore.acquire(0))
+        granted = []
+        waiters = []
+        for name in "abc":
+            waiter = threading.Thread(
+                target=lambda name=name: semaphore.acquire(2) and granted.append(name)
+            )
+            waiter.start()
+            waiters.append(waiter)
+            while semaphore.waiting() < len(waiters):
+                time.sleep(0.001)
+        # A newcomer can't jump the queue, even the moment a permit is freed
+        semaphore.release()
+        self.assertFalse(semaphore.try_acquire())
+        for _ in "bc":
+            while len(granted) < len(waiters) - semaphore.waiting():
+                time.sleep(0.001)
+            semaphore.release()
+        for waiter in waiters:
+            waiter.join()
+        self.assertEqual(granted, ["a", "b", "c"])
+        semaphore.release()
+        self.assertEqual(semaphore.in_use, 0)
+        self.assertTrue(semaphore.try_acquire())
+
+    def test_timed_out_waiter_leaves_the_queue(self):
+        semaphore = FairSemaphore(1)
+        semaphore.acquire(0)
+        self.assertFalse(semaphore.acquire(0.01))
+        self.assertEqual(semaphore.waiting(), 0)
+        semaphore.release()
+        self.assertEqual(semaphore.in_use, 0)
+
+
+class GovernorTests(SimpleTestCase):
+    def pool(self, governor, host):
+        pooler = ConnectionPooler(
+            standin_database(host),
+            {"pool_size": 3, "queue_size": 20, "queue_timeout_ms": 1000},
+            connect=standin_connect(0.02),
+        )
+        pooler.coalesce_reads = False
+        pooler.governor = governor
+        governor.register(pooler)
+        self.addCleanup(pooler.shutdown)
+        return pooler
+
+    def test_idle_connections_of_the_same_user_are_reclaimed(self):
+        # Both stand-in pools belong to the same (anonymous) user, on different hosts
+        governor = ConnectionGovernor(90, 3, 100, 100)
+        parked = self.pool(governor, "host-x")
+        parked.execute_statements([("SELECT 1", None, False)] * 6)
+        self.assertEqual(len(parked.idle_connections), 3)
+
+        summary = self.pool(governor, "host-y").execute_statements([("SELECT 1", None, False)] * 10)
+        self.assertEqual(summary["successful_requests"], 10)
+        self.assertLess(len(parked.idle_connections), 3)
+
+
+class RunQueryTests(SimpleTestCase):
+    def run_recorded(self, query):
+        conn = StandInConnection(rows=[(i,) for i in range(5)])
+        names = []
+        cursor = conn.cursor
+
+        def recording_cursor(name=None):
+            names.append(name)
+            return cursor(name)
+
+        conn.cursor = recording_cursor
+        with run_query(conn, query) as result:
+            return [name is not None for name in names], list(result)
+
+    def test_plain_read_streams_through_a_named_cursor(self):
+        named, rows = self.run_recorded("SELECT id FROM t")
+        self.assertEqual(named, [False, True])
+        self.assertEqual(rows, [(i,) for i in range(5)])
+
+    def test_writing_selects_use_the_client_cursor(self):
+        for query in (
+            "WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d",
+            "SELECT * INTO t2 FROM t",
+        ):
+            named, rows = self.run_recorded(query)
+            self.assertEqual(named, [False], query)
+            self.assertEqual(rows, [(i,) for i in range(5)])
+
+
+class PoolSweepTests(SimpleTestCase):
+    def sweep(self, *points):
+        sweep = PoolSweep(standin_database("sweep"), [], 1000)
+        sweep.points = [
+            {"pool_size": size, "queue_size": 10, "throughput_rps": rps,
+             "failed_requests": failed, "p99_ms": 5}
+            for size, rps, failed in points
+        ]
+        return sweep
+
+    def test_knee_skips_points_that_failed_requests(self):
+        knee = self.sweep((5, 100, 3), (10, 98, 0), (20, 99, 0)).knee()
+        self.assertEqual(knee["pool_size"], 10)
+
+    def test_no_knee_when_every_point_failed(self):
+        result = self.sweep((5, 100, 3), (10, 120, 1)).result()
+        self.assertIsNone(result["knee"])
+        self.assertIsNone(result["recommended_config"])
+
+
+class ColumnarTests(SimpleTestCase):
+    description = (("id", 23), ("name", 25))
+
+    def test_binary_header_carries_truncation(self):
+        rows = [(1, "a"), (2, "b"), (3, "c")]
+        for max_rows, truncated in ((2, True), (3, False)):
+            data = columnar.ColumnarResult.from_rows(self.description, rows, max_rows).to_bytes()
+            self.assertEqual(data[:4], columnar.MAGIC)
+            row_count, column_count, flags = struct.unpack_from("<IHB", data, 4)
+            self.assertEqual((row_count, column_count), (max_rows, 2))
+            self.assertEqual(bool(flags & columnar.FLAG_TRUNCATED), truncated)
+
+    typed_description = (("id", 23), ("day", 1082), ("at", 1184), ("note", 25), ("ok", 16))
+    typed_rows = [
+        (1, date(2024, 2, 29), datetime(2024, 2, 29, 12, 0, 1, 5, tzinfo=timezone.utc), "a", True),
+        (None, None, None, None, None),
+        (3, date(1969, 12, 31), datetime(1970, 1, 1, 0, 0, 1, tzinfo=timezone.utc), "ü", False),
+    ]
+
+    def test_json_encoding_keeps_types_and_nulls(self):
+        encoded = columnar.ColumnarResult.from_rows(self.typed_description, self.typed_rows).to_json()
+        self.assertEqual([c["type"] for c in encoded["columns"]],
+                         ["int32", "date", "timestamp", "text", "bool"])
+        self.assertEqual(encoded["values"], [
+            [1, None, 3],
+            ["2024-02-29", None, "1969-12-31"],
+            ["2024-02-29T12:00:01.000005", None, "1970-01-01T00:00:01"],
+            ["a", None, "ü"],
+            [True, None, False],
+        ])
+
+    def test_binary_encoding_keeps_types_and_nulls(self):
+        data = columnar.ColumnarResult.from_rows(self.typed_description, self.typed_rows).to_bytes()
+        row_count, column_count, _ = struct.unpack_from("<IHB", data, 4)
+        self.assertEqual((row_count, column_count), (3, 5))
+        offset = 11
+        kinds = []
+        for _ in range(column_count):
+            (length,) = struct.unpack_from("<H", data, offset)
+            offset += 2 + length
+            kinds.append(data[offset])
+            offset += 1
+        sections = []
+        for _ in range(column_count):
+            (length,) = struct.unpack_from("<I", data, offset)
+            sections.append(data[offset + 4:offset + 4 + length])
+            offset += 4 + length
+        self.assertEqual(offset, len(data))
+        self.assertEqual(kinds, [columnar.INT32, columnar.DATE, columnar.TIMESTAMP,
+                                 columnar.TEXT, columnar.BOOL])
+        # One bitmap byte for three rows; only the middle row is null
+        self.assertTrue(all(section[0] == 0b010 for section in sections))
+        self.assertEqual(struct.unpack("<3i", sections[0][1:]), (1, 0, 3))
+        self.assertEqual(struct.unpack("<3i", sections[1][1:]), (19782, 0, -1))
+        self.assertEqual(struct.unpack("<3q", sections[2][1:]),
+                         (1709208001000005, 0, 1000000))
+        text_offsets = struct.unpack_from("<4I", sections[3], 1)
+        self.assertEqual(text_offsets, (0, 1, 1, 3))
+        self.assertEqual(sections[3][17:].decode(), "aü")
+        self.assertEqual(sections[4][1:], bytes([1, 0, 0]))
+
+
+class PerfSuiteTests(SimpleTestCase):
+    results = {
+        "fast": {"throughput": 1000.0, "p99_ms": 2.0, "ops": 10},
+        "slow": {"throughput": 100.0, "p99_ms": 20.0, "ops": 10},
+    }
+
+    def baseline(self, **overrides):
+        return {**perfsuite.build_baseline(self.results), **overrides}
+
+    def test_compare_applies_the_tolerance_both_ways(self):
+        current = {
+            # 10% less throughput and 10% more p99: inside a 15% tolerance
+            "fast": {"throughput": 900.0, "p99_ms": 2.2, "ops": 10},
+            # p99 up by half
+            "slow": {"throughput": 100.0, "p99_ms": 30.0, "ops": 10},
+            "added": {"throughput": 5.0, "p99_ms": 1.0, "ops": 10},
+        }
+        rows = {row["benchmark"]: row for row in perfsuite.compare(current, self.baseline(), 0.15)}
+        self.assertEqual(rows["fast"]["status"], "ok")
+        self.assertEqual(rows["fast"]["throughput_change_percent"], -10.0)
+        self.assertEqual(rows["slow"]["status"], "regressed")
+        self.assertEqual(rows["slow"]["p99_change_percent"], 50.0)
+        self.assertEqual(rows["added"]["status"], "new")
+
+    def test_throughput_drop_beyond_tolerance_regresses(self):
+        current = {"fast": {"throughput": 800.0, "p99_ms": 2.0, "ops": 10}}
+        rows = perfsuite.compare(current, self.baseline(), 0.15)
+        self.assertEqual(rows[0]["status"], "regressed")
+
+    def run_command(self, path, *args, results=None):
+        with mock.patch("core.management.commands.perf_suite.run_suite",
+                        return_value=results or self.results):
+            call_command("perf_suite", "--baseline", path, *args, stdout=mock.MagicMock())
+
+    def test_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/baseline.json"
+            self.run_command(path, "--update")
+            saved = perfsuite.load_baseline(path)
+            self.assertEqual(saved["benchmarks"], self.results)
+            self.assertEqual((saved["version"], saved["target"]), (perfsuite.SUITE_VERSION, "standin"))
+            # Same results against the saved baseline: no regression
+            self.run_command(path)
+            slower = {**self.results, "fast": {"throughput": 500.0, "p99_ms": 2.0, "ops": 10}}
+            with self.assertRaisesMessage(CommandError, "regression in: fast"):
+                self.run_command(path, results=slower)
+
+    def test_baseline_from_another_version_or_target_is_refused(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/baseline.json"
+            perfsuite.save_baseline(path, self.baseline(version=perfsuite.SUITE_VERSION + 1))
+            with self.assertRaisesMessage(CommandError, "rerun with --update"):
+                self.run_command(path)
+            perfsuite.save_baseline(path, self.baseline(target="database:7"))
+            with self.assertRaisesMessage(CommandError, "recorded against database:7"):
+                self.run_command(path)
+
+
+class StatisticsTests(SimpleTestCase):
+    def test_exact_mann_whitney_u(self):
+        self.assertEqual(mann_whitney_u([1, 2, 3], [4, 5, 6]),
+                         {"u": 0.0, "p_value": 0.1, "method": "exact"})
+        self.assertEqual(mann_whitney_u([1, 3, 5], [2, 4, 6]),
+                         {"u": 3.0, "p_value": 0.7, "method": "exact"})
+        self.assertEqual(mann_whitney_u(range(1, 6), range(6, 11))["p_value"], 0.007937)
+
+    def test_ties_use_the_corrected_normal_approximation(self):
+        # Ranks worked by hand: U = 6.5, tie term 66, z = 21 / 8.5557
+        result = mann_whitney_u([1, 2, 2, 3, 4, 4, 5], [3, 4, 5, 5, 6, 7, 7, 8])
+        self.assertEqual((result["u"], result["method"]), (6.5, "normal"))
+        self.assertAlmostEqual(result["p_value"], 0.0141, places=4)
+
+    def test_mann_whitney_u_without_samples(self):
+        self.assertEqual(mann_whitney_u([], [1, 2])["p_value"], 1.0)
+        self.assertEqual(mann_whitney_u([3, 3], [3, 3])["p_value"], 1.0)
+
+    def test_median_ci(self):
+        self.assertEqual(median_ci([]), [0, 0])
+        self.assertEqual(median_ci([7]), [7, 7])
+        self.assertEqual(median_ci([4] * 20), [4, 4])
+        low, high = median_ci(list(range(101)), rng=random.Random(1))
+        self.assertLessEqual(low, 50)
+        self.assertGreaterEqual(high, 50)
+        self.assertGreater(low, 35)
+        self.assertLess(high, 65)
+
+
+class CachedAuthenticationTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = UserCache(max_entries=10, ttl_seconds=60)
+        patcher = mock.patch("core.authentication.get_user_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = SimpleNamespace(pk=1, is_active=True, password="x")
+        patcher = mock.patch.object(JWTAuthentication, "get_user", return_value=self.user)
+        self.load_user = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def authenticate(self, version=0):
+        return CachedJWTAuthentication().get_user({"user_id": 1, TOKEN_VERSION_CLAIM: version})
+
+    def test_second_request_is_served_from_the_cache(self):
+        first = self.authenticate()
+        second = self.authenticate()
+        self.assertEqual(self.load_user.call_count, 1)
+        # Each request gets its own copy, so views can't change the cached user
+        self.assertIsNot(first, second)
+        self.assertIsNot(second, self.user)
+
+    def test_invalidation_and_new_token_version_reload_the_user(self):
+        self.authenticate()
+        self.cache.invalidate(1)
+        self.authenticate()
+        self.assertEqual(self.load_user.call_count, 2)
+        self.authenticate(version=1)
+        self.assertEqual(self.load_user.call_count, 3)
+
+    def test_cached_inactive_user_is_refused(self):
+        self.authenticate()
+        self.user.is_active = False
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        self.assertEqual(self.load_user.call_count, 1)
+
+
+class PublicStatsTests(SimpleTestCase):
+    def setUp(self):
+        self.stats = PublicStats(resync_seconds=300)
+
+        def load():
+            # Stands in for the table counts
+            self.stats.users, self.stats.databases, self.stats.pool_configs = 2, 3, 2
+            self.stats.pool_sums = {"pool_size": 30, "queue_size": 200, "queue_timeout_ms": 10000}
+            self.stats._loaded_at = time.monotonic()
+            self.stats._snapshot = None
+
+        self.stats._load = load
+        for target in ("core.signals.get_public_stats", "core.views.get_public_stats"):
+            patcher = mock.patch(target, return_value=self.stats)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # No database here, so commit hooks run straight away
+        patcher = mock.patch("core.signals.transaction.on_commit", side_effect=lambda func: func())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_signals_apply_deltas_to_the_loaded_figures(self):
+        data, etag = self.stats.snapshot()
+        self.assertEqual((data["users_registered"], data["avg_pool_size"]), (2, 15))
+        signals.user_saved(None, SimpleNamespace(pk=9), created=True)
+        config = SimpleNamespace(pool_size=20, queue_size=100, queue_timeout_ms=5000)
+        signals.pool_config_loaded(None, config)
+        config.pool_size = 40
+        with mock.patch("core.signals._bump_for_pool_config"):
+            signals.pool_config_saved(None, config, created=False)
+        data, changed_etag = self.stats.snapshot()
+        self.assertEqual(data["users_registered"], 3)
+        self.assertEqual(data["avg_pool_size"], 25)
+        self.assertEqual(data["avg_queue_size"], 100)
+        self.assertNotEqual(changed_etag, etag)
+
+    def test_deltas_before_the_first_load_are_ignored(self):
+        signals.user_saved(None, SimpleNamespace(pk=9), created=True)
+        self.assertEqual(self.stats.snapshot()[0]["users_registered"], 2)
+
+    def test_matching_etag_gets_304(self):
+        factory = APIRequestFactory()
+        first = views.public_stats(factory.get("/stats/"))
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        again = views.public_stats(factory.get("/stats/", HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], etag)
+        signals.user_deleted(None, SimpleNamespace(pk=9))
+        changed = views.public_stats(factory.get("/stats/", HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data["data"]["users_registered"], 1)
+
+
+class FakeQuerySet:
+    """The slice of the QuerySet API list_databases uses, over plain objects."""
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def filter(self, id__gt=0, **kwargs):
+        return FakeQuerySet(row for row in self.rows if row.id > id__gt)
+
+    def select_related(self, *fields):
+        return self
+
+    def order_by(self, *fields):
+        return FakeQuerySet(sorted(self.rows, key=lambda row: row.id))
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class DatabaseListTests(SimpleTestCase):
+    etag = '"dbs-1-4-abc"'
+    last_modified = 1700000000
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        rows = [SimpleNamespace(id=i) for i in (2, 3, 5, 8, 13)]
+        for target, value in (
+            ("core.views._database_validators", mock.Mock(return_value=(self.etag, self.last_modified))),
+            ("core.views.UserDatabase.objects", FakeQuerySet(rows)),
+            ("core.views.UserDatabaseSerializer",
+             lambda objs, many: SimpleNamespace(data=[obj.id for obj in objs])),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, path="/databases/", **headers):
+        request = self.factory.get(path, **headers)
+        force_authenticate(request, user=SimpleNamespace(pk=1, is_authenticated=True))
+        return views.list_databases(request)
+
+    def test_matching_validators_get_304(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["ETag"], self.etag)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=self.etag).status_code, 304)
+        since = http_date(self.last_modified)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+        # If-None-Match wins over a still-valid If-Modified-Since
+        stale = self.get(HTTP_IF_NONE_MATCH='"dbs-1-3-abc"', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(stale.status_code, 200)
+
+    def test_keyset_pages_walk_the_list_once(self):
+        pages, path = [], "/databases/?limit=2"
+        while path:
+            data = self.get(path).data["data"]
+            pages.append(data["results"])
+            cursor = data["next_cursor"]
+            path = f"/databases/?limit=2&cursor={cursor}" if cursor else None
+        self.assertEqual(pages, [[2, 3], [5, 8], [13]])
+        # The cursor seeks past an id, so it still works if that row is deleted
+        cursor = urlsafe_base64_encode(b"4")
+        self.assertEqual(self.get(f"/databases/?limit=2&cursor={cursor}").data["data"]["results"], [5, 8])
+        self.assertEqual(self.get("/databases/?cursor=%%%").status_code, 400)
+
+    def test_without_paging_parameters_the_whole_list_is_returned(self):
+        self.assertEqual(self.get().data["data"], [2, 3, 5, 8, 13])
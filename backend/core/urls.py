@@ -17,6 +17,14 @@ urlpatterns = [
     path("databases/<int:db_id>/delete/", views.delete_database, name="delete-database"),
     path("databases/<int:db_id>/reveal-password/", views.reveal_database_password, name="reveal-database-password"),
     path("databases/<int:db_id>/test/", views.test_database_connection, name="test_database_connection"),
+    path("databases/<int:db_id>/pool/", views.pool_status, name="pool-status"),
+    path("databases/<int:db_id>/query/", views.query_database, name="query-database"),
+    path("databases/<int:db_id>/pool/connections/", views.pool_connections, name="pool-connections"),
+    path("databases/<int:db_id>/statements/", views.statement_stats, name="statement-stats"),
+    path("databases/<int:db_id>/workloads/", views.workloads, name="workloads"),
+    path("databases/<int:db_id>/workloads/<int:workload_id>/", views.workload_detail, name="workload-detail"),
+    path("databases/<int:db_id>/capture/", views.capture_queries, name="capture-queries"),
+    path("databases/<int:db_id>/replay/", views.replay_queries, name="replay-queries"),
     
     # Test Page
     path("test-pooler/<int:db_id>/", views.test_with_pooler, name="execute-pooler-query"),
@@ -24,6 +32,12 @@ urlpatterns = [
     
     # Compare Page
     path("compare-pooler/<int:db_id>/", views.compare_pooling, name="compare-pooler-vs-direct"),
+
+    # Sweep
+    path("sweep-pooler/<int:db_id>/", views.sweep_pooler, name="sweep-pooler"),
+
+    # Engine Status
+    path("executor/usage/", views.executor_usage, name="executor-usage"),
     
     # User Setting Page
     path("update/", views.update_user_details, name="update-user"),
@@ -1,45 +1,91 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
-from .serializers import RegisterSerializer, UserSerializer, UserDatabaseSerializer
-from .models import UserDatabase, PoolerConfig
-from django.db.models import Avg
+from .authentication import TOKEN_VERSION_CLAIM, invalidate_user
+from .stats import get_public_stats
+from .renderers import ColumnarBinaryRenderer, ColumnarJSONRenderer
+from .serializers import RegisterSerializer, UserSerializer, UserDatabaseSerializer, WorkloadSerializer
+from .models import UserDatabase, Workload
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, urlsafe_base64_decode, urlsafe_base64_encode
 import psycopg2
+import sqlparse
 from psycopg2 import OperationalError
+import hashlib
+import os
 import time
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import authenticate
-from .pooler_engine.pool_manager import ConnectionPooler
+from .pooler_engine.registry import find_pooler, get_pooler, refresh_pooler, discard_pooler
+from .pooler_engine.sweep import PoolSweep
+from .pooler_engine.workload import TEST_QUERY, compile_workload
+from .pooler_engine.columnar import ColumnarResult
+from .pooler_engine.fingerprint import fingerprint
+from .pooler_engine.capture import TRACE_NAME, TraceReplayer, list_traces, read_events, trace_files
+from .pooler_engine.config import get_engine_config, get_pool_config
+from .pooler_engine.governor import budget_keys, get_governor
+from .pooler_engine.abtest import DIRECT, POOLED, InterleavedComparison
 from .pooler_engine.db_client import execute_db_query
-import concurrent.futures
-import psutil
+from .pooler_engine.buffering import get_memory_budget
+from .pooler_engine.executor import get_executor, ExecutorRejected
+from .pooler_engine.profiler import build_profiler, profiler_top_n
+from contextlib import nullcontext
+from itertools import islice
 
 User = get_user_model()
 
+# Upper bound on configurations measured by one grid sweep
+MAX_SWEEP_POINTS = 50
+MAX_AB_TRIALS = 20
+# Largest page returned by a paginated database listing
+MAX_DATABASE_PAGE = 100
+MAX_QUERY_ROWS = 100000
+
 def response(success, message, data=None, status_code=status.HTTP_200_OK):
     return Response({"success": success, "message": message, "data": data}, status=status_code)
 
+def executor_caller(request):
+    """Key used to account shared executor usage per user."""
+    return f"user:{request.user.id}"
+
+def flag(request, name):
+    return str(request.data.get(name, "")).lower() in ("1", "true", "yes", "on")
+
+def profiler_for(request):
+    """Sampling profiler when the request opts in with `profile`, else None."""
+    return build_profiler() if flag(request, "profile") else None
+
+def load_statements(request, user_db, num_requests):
+    """
+    Statement stream for a test run: the saved workload given by `workload_id`,
+    or the fixed TEST_QUERY. Generated up front so it stays out of the timings.
+    Returns None if the workload does not exist.
+    """
+    workload_id = request.data.get("workload_id")
+    if not workload_id:
+        return [(TEST_QUERY, None, True)] * num_requests
+    try:
+        workload = Workload.objects.get(id=workload_id, user_db=user_db)
+    except Workload.DoesNotExist:
+        return None
+    return compile_workload(workload.statements).generate(num_requests, request.data.get("seed"))
+
 @api_view(["GET"])
 def public_stats(request):
-    users_registered = User.objects.count()
-    databases_connected = UserDatabase.objects.count()
-    pool_stats = PoolerConfig.objects.aggregate(
-        avg_pool_size = Avg("pool_size"),
-        avg_queue_size = Avg("queue_size"),
-        avg_timeout_ms = Avg("queue_timeout_ms"),
-    )
-
-    data = {
-        "users_registered": users_registered,
-        "databases_connected": databases_connected,
-        "avg_pool_size": round(pool_stats["avg_pool_size"] or 0, 2),
-        "avg_queue_size": round(pool_stats["avg_queue_size"] or 0, 2),
-        "avg_timeout_ms": round(pool_stats["avg_timeout_ms"] or 0, 2),
-    }
-    return response(True,"Stats loaded successfully",data,200)
+    # Maintained incrementally by core.signals; no table scans per request
+    data, etag = get_public_stats().snapshot()
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in if_none_match or "*" in if_none_match:
+        not_modified = Response(status=status.HTTP_304_NOT_MODIFIED)
+        not_modified["ETag"] = etag
+        return not_modified
+    resp = response(True,"Stats loaded successfully",data,200)
+    resp["ETag"] = etag
+    resp["Cache-Control"] = "no-cache"
+    return resp
 
 @api_view(["POST"])
 def register_user(request):
@@ -59,6 +105,7 @@ def login_user(request):
         return response(False, "Invalid email or password", None, 400)
 
     refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
     return response(True, "Login successful", {
         "access": str(refresh.access_token),
         "refresh": str(refresh),
@@ -75,13 +122,16 @@ def get_user_details(request):
 def update_user_details(request):
     user = request.user
     user.full_name = request.data.get("full_name", user.full_name)
-    user.save()
+    # request.user may be a cached copy; write only what changed
+    user.save(update_fields=["full_name"])
+    invalidate_user(user)
     return response(True, "User details updated", UserSerializer(user).data)
 
 @api_view(["PUT", "PATCH"])
 @permission_classes([IsAuthenticated])
 def change_password(request):
-    user = request.user
+    # Check against the stored hash, not a possibly cached copy
+    user = User.objects.get(pk=request.user.pk)
     old_password = request.data.get("old_password")
     new_password = request.data.get("new_password")
     confirm_password = request.data.get("confirm_password")
@@ -92,7 +142,8 @@ def change_password(request):
         return response(False, "Passwords do not match", None, 400)
 
     user.set_password(new_password)
-    user.save()
+    user.save(update_fields=["password"])
+    invalidate_user(user)
     return response(True, "Password changed successfully", UserSerializer(user).data)
 
 
@@ -109,19 +160,78 @@ def create_database(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def list_databases(request):
-    dbs = UserDatabase.objects.filter(user=request.user)
-    serializer = UserDatabaseSerializer(dbs, many=True)
-    return response(True, "Databases fetched successfully", serializer.data)
+    validators = _database_validators(request, "list", request.GET.urlencode())
+    if _not_modified(request, *validators):
+        return _not_modified_response(*validators)
+    # pool_config is joined in, so the query count is constant in the list size
+    dbs = UserDatabase.objects.filter(user=request.user).select_related("pool_config").order_by("id")
+    if "limit" not in request.GET and "cursor" not in request.GET:
+        data = UserDatabaseSerializer(dbs, many=True).data
+    else:
+        try:
+            limit = min(max(int(request.GET.get("limit", MAX_DATABASE_PAGE)), 1), MAX_DATABASE_PAGE)
+            after = int(urlsafe_base64_decode(request.GET["cursor"])) if request.GET.get("cursor") else 0
+        except (TypeError, ValueError):
+            return response(False, "limit must be an integer and cursor a value returned by this endpoint", None, 400)
+        # Keyset pagination: seeks on the primary key instead of counting offsets
+        page = list(dbs.filter(id__gt=after)[:limit + 1])
+        more = len(page) > limit
+        page = page[:limit]
+        data = {
+            "results": UserDatabaseSerializer(page, many=True).data,
+            "next_cursor": urlsafe_base64_encode(str(page[-1].id).encode()) if more else None,
+        }
+    return _with_validators(response(True, "Databases fetched successfully", data), *validators)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_database(request, db_id):
+    validators = _database_validators(request, "detail", db_id)
+    if _not_modified(request, *validators):
+        return _not_modified_response(*validators)
     try:
-        db = UserDatabase.objects.get(id=db_id, user=request.user)
+        db = UserDatabase.objects.select_related("pool_config").get(id=db_id, user=request.user)
     except UserDatabase.DoesNotExist:
         return response(False, "Database not found", None, 404)
-    return response(True, "Database fetched successfully", UserDatabaseSerializer(db).data)
+    return _with_validators(
+        response(True, "Database fetched successfully", UserDatabaseSerializer(db).data), *validators
+    )
+
+
+def _database_validators(request, *scope):
+    # Read fresh: request.user may come from the auth cache with a stale version
+    version, changed_at, joined = User.objects.filter(pk=request.user.pk).values_list(
+        "databases_version", "databases_changed_at", "date_joined"
+    ).get()
+    tag = ":".join(str(part) for part in scope)
+    etag = f'"dbs-{request.user.pk}-{version}-{_hash_scope(tag)}"'
+    return etag, int((changed_at or joined).timestamp())
+
+
+def _hash_scope(value):
+    return hashlib.blake2s(value.encode(), digest_size=6).hexdigest()
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        tags = parse_etags(if_none_match)
+        return etag in tags or "*" in tags
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and last_modified <= since
+
+
+def _not_modified_response(etag, last_modified):
+    return _with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+
+def _with_validators(resp, etag, last_modified):
+    resp["ETag"] = etag
+    resp["Last-Modified"] = http_date(last_modified)
+    resp["Cache-Control"] = "private, no-cache"
+    return resp
 
 
 @api_view(["PUT", "PATCH"])
@@ -134,6 +244,8 @@ def update_database(request, db_id):
     serializer = UserDatabaseSerializer(db, data=request.data, partial=True, context={"request": request})
     if serializer.is_valid():
         serializer.save()
+        # Push the new pool settings into the live pool, if one is running
+        refresh_pooler(UserDatabase.objects.select_related("pool_config").get(id=db.id))
         return response(True, "Database updated successfully", serializer.data)
     return response(False, "Update failed", serializer.errors, 400)
 
@@ -144,6 +256,7 @@ def delete_database(request, db_id):
     try:
         db = UserDatabase.objects.get(id=db_id, user=request.user)
         db.delete()
+        discard_pooler(db_id)
         return response(True, "Database deleted successfully")
     except UserDatabase.DoesNotExist:
         return response(False, "Database not found", None, 404)
@@ -167,6 +280,51 @@ def reveal_database_password(request, db_id):
     return response(True, "Database password retrieved", {"password": decrypted})
 
 
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def workloads(request, db_id):
+    """
+    List the saved workloads of a database, or save a new one.
+    """
+    try:
+        user_db = UserDatabase.objects.get(id=db_id, user=request.user)
+    except UserDatabase.DoesNotExist:
+        return response(False, "Database not found", None, 404)
+
+    if request.method == "GET":
+        serializer = WorkloadSerializer(user_db.workloads.all(), many=True)
+        return response(True, "Workloads fetched successfully", serializer.data)
+
+    serializer = WorkloadSerializer(data=request.data)
+    if serializer.is_valid():
+        serializer.save(user_db=user_db)
+        return response(True, "Workload saved successfully", serializer.data)
+    return response(False, "Invalid workload", serializer.errors, 400)
+
+
+@api_view(["GET", "PUT", "PATCH", "DELETE"])
+@permission_classes([IsAuthenticated])
+def workload_detail(request, db_id, workload_id):
+    try:
+        workload = Workload.objects.get(
+            id=workload_id, user_db_id=db_id, user_db__user=request.user
+        )
+    except Workload.DoesNotExist:
+        return response(False, "Workload not found", None, 404)
+
+    if request.method == "GET":
+        return response(True, "Workload fetched successfully", WorkloadSerializer(workload).data)
+    if request.method == "DELETE":
+        workload.delete()
+        return response(True, "Workload deleted successfully")
+
+    serializer = WorkloadSerializer(workload, data=request.data, partial=True)
+    if serializer.is_valid():
+        serializer.save()
+        return response(True, "Workload updated successfully", serializer.data)
+    return response(False, "Update failed", serializer.errors, 400)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def test_database_connection(request, db_id):
@@ -203,7 +361,7 @@ def test_database_connection(request, db_id):
 def test_with_pooler(request, db_id):
     """
     Run parallel requests using the Python pooler engine.
-    The query is defined internally, not from the request body.
+    Runs the fixed test query, or a saved workload when `workload_id` is given.
     """
     
     try:
@@ -213,28 +371,36 @@ def test_with_pooler(request, db_id):
 
     num_requests = int(request.data.get("num_requests", 10))
 
-    # Define a fixed test query
-    query =  """
-    SELECT 
-        schemaname, tablename, tableowner,
-        tablespace, hasindexes, hasrules 
-    FROM pg_tables 
-    WHERE schemaname NOT IN ('information_schema', 'pg_catalog')
-    LIMIT 15;
-    """
+    statements = load_statements(request, user_db, num_requests)
+    if statements is None:
+        return response(False, "Workload not found", None, 404)
+
+    # Optional sampled raw phase traces ("json" or "chrome" trace format)
+    trace_sample_rate = float(request.data.get("trace_sample_rate", 0))
+    trace_format = request.data.get("trace_format", "json")
 
     # Initialize pooler
-    pooler = ConnectionPooler(user_db)
-    metrics = pooler.execute_requests(query, num_requests)
+    profiler = profiler_for(request)
+    pooler = get_pooler(user_db)
+    with profiler or nullcontext():
+        metrics = pooler.execute_statements(
+            statements,
+            caller=executor_caller(request),
+            trace_sample_rate=trace_sample_rate,
+            trace_format=trace_format,
+        )
 
-    return response(True, "Test with pooler completed", {
+    data = {
         "pool_config": {
             "pool_size": pooler.pool_size,
             "queue_size": pooler.queue_size,
             "queue_timeout_ms": pooler.queue_timeout * 1000
         },
         "metrics": metrics
-    })
+    }
+    if profiler:
+        data["profile"] = profiler.report(profiler_top_n())
+    return response(True, "Test with pooler completed", data)
 
 
 @api_view(["POST"])
@@ -250,35 +416,189 @@ def test_without_pooler(request, db_id):
 
     num_requests = int(request.data.get("num_requests", 10))
 
-    query =  """
-    SELECT 
-        schemaname, tablename, tableowner,
-        tablespace, hasindexes, hasrules 
-    FROM pg_tables 
-    WHERE schemaname NOT IN ('information_schema', 'pg_catalog')
-    LIMIT 15;
-    """
+    statements = load_statements(request, user_db, num_requests)
+    if statements is None:
+        return response(False, "Workload not found", None, 404)
 
     start_time = time.time()
-
-    # Parallel execution without pooling
-    with concurrent.futures.ThreadPoolExecutor(max_workers=num_requests) as executor:
-        futures = [executor.submit(execute_db_query, user_db, query) for _ in range(num_requests)]
+    executor = get_executor()
+    caller = executor_caller(request)
+    profiler = profiler_for(request)
+
+    # Parallel execution without pooling, on the shared executor
+    futures = []
+    failed = 0
+    with profiler or nullcontext():
+        for query, params, _ in statements:
+            try:
+                futures.append(executor.submit(caller, execute_db_query, user_db, query, params))
+            except ExecutorRejected:
+                failed += 1
         for f in futures:
             try:
                 f.result()
             except Exception:
-                pass
+                failed += 1
 
     total_time = (time.time() - start_time) * 1000
 
-    return response(True, "Test without pooler completed", {
+    data = {
         "metrics": {
-            "successful_requests": num_requests,
-            "failed_connections": 0,
+            "successful_requests": num_requests - failed,
+            "failed_connections": failed,
             "avg_queue_wait_ms": 0,
             "total_execution_time_ms": total_time
         }
+    }
+    if profiler:
+        data["profile"] = profiler.report(profiler_top_n())
+    return response(True, "Test without pooler completed", data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def pool_status(request, db_id):
+    """
+    Live pool state for a database. Without a live pool only its configuration
+    is reported; looking does not open one.
+    """
+    try:
+        user_db = UserDatabase.objects.get(id=db_id, user=request.user)
+    except UserDatabase.DoesNotExist:
+        return response(False, "Database not found", None, 404)
+    pooler = find_pooler(user_db.id)
+    pool = {"live": False, **get_pool_config(user_db)} if pooler is None else {"live": True, **pooler.stats()}
+    return response(True, "Pool status fetched", {
+        **pool,
+        "global_budgets": get_governor().stats(*budget_keys(user_db)),
+        "result_memory": get_memory_budget().stats(),
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def pool_connections(request, db_id):
+    """
+    Every physical connection in a database's live pool: state, age, use count,
+    and for borrowed connections the holder, current statement and leak flag.
+    """
+    try:
+        user_db = UserDatabase.objects.get(id=db_id, user=request.user)
+    except UserDatabase.DoesNotExist:
+        return response(False, "Database not found", None, 404)
+    pooler = find_pooler(user_db.id)
+    if pooler is None:
+        return response(True, "Pool connections fetched", {
+            "leak_threshold_ms": get_engine_config("leaks")["threshold_ms"],
+            "leaks_detected": 0,
+            "leaks_reclaimed": 0,
+            "connections": [],
+        })
+    return response(True, "Pool connections fetched", {
+        "leak_threshold_ms": round(pooler.leak_threshold * 1000),
+        "leaks_detected": pooler.leaks_detected,
+        "leaks_reclaimed": pooler.leaks_reclaimed,
+        "connections": pooler.connections(),
+    })
+
+
+@api_view(["POST"])
+@renderer_classes([JSONRenderer, ColumnarJSONRenderer, ColumnarBinaryRenderer])
+@permission_classes([IsAuthenticated])
+def query_database(request, db_id):
+    """
+    Runs a read-only statement through the database's pool and returns its rows.
+    The Accept header picks the encoding: application/json (rows),
+    application/vnd.pcsaver.columnar+json (one typed array per column) or
+    application/vnd.pcsaver.columnar (length-prefixed binary columns).
+    """
+    try:
+        user_db = UserDatabase.objects.get(id=db_id, user=request.user)
+    except UserDatabase.DoesNotExist:
+        return response(False, "Database not found", None, 404)
+
+    sql = request.data.get("sql")
+    if not isinstance(sql, str) or not sql.strip():
+        return response(False, "sql is required", None, 400)
+    # fingerprint() only classifies the first statement, so require exactly one
+    if len(sqlparse.split(sql)) != 1 or not fingerprint(sql).is_read:
+        return response(False, "Only a single read-only statement can be run here", None, 400)
+    try:
+        max_rows = max(0, min(int(request.data.get("max_rows", MAX_QUERY_ROWS)), MAX_QUERY_ROWS))
+    except (TypeError, ValueError):
+        return response(False, "max_rows must be an integer", None, 400)
+
+    # One row past the cap tells whether the result was truncated
+    outcome, result = get_pooler(user_db).fetch(
+        sql, request.data.get("params"), row_limit=max_rows + 1, read_only=True
+    )
+    if outcome is not None:
+        return response(False, f"Query failed: {outcome}", None, 400)
+    if result is None:
+        return response(True, "Query executed", None)
+
+    with result:
+        if request.accepted_renderer.format in (ColumnarJSONRenderer.format, ColumnarBinaryRenderer.format):
+            # Rows go straight into per-column arrays; no per-row dicts
+            data = ColumnarResult.from_rows(result.description, result, max_rows)
+        else:
+            rows = [list(row) for row in islice(result, max_rows)]
+            data = {
+                "columns": [column[0] for column in result.description or ()],
+                "row_count": len(rows),
+                "truncated": len(result) > max_rows,
+                "rows": rows,
+            }
+    return response(True, "Query executed", data)
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAuthenticated])
+def statement_stats(request, db_id):
+    """
+    Per-fingerprint statement statistics for a database's live pool.
+    GET lists the top statements (?limit=, ?order_by=); DELETE resets them.
+    """
+    try:
+        user_db = UserDatabase.objects.get(id=db_id, user=request.user)
+    except UserDatabase.DoesNotExist:
+        return response(False, "Database not found", None, 404)
+
+    pooler = find_pooler(user_db.id)
+    if request.method == "DELETE":
+        if pooler is not None:
+            pooler.statement_stats.reset()
+        return response(True, "Statement statistics reset")
+    if pooler is None:
+        return response(True, "Statement statistics fetched", {
+            "statements": [],
+            "tracked": 0,
+            "max_entries": get_engine_config("statements")["max_entries"],
+            "evicted": 0,
+        })
+    stats = pooler.statement_stats
+
+    limit = int(request.query_params.get("limit", 20))
+    order_by = request.query_params.get("order_by", "total_time")
+    return response(True, "Statement statistics fetched", {
+        "statements": stats.top(limit, order_by),
+        "tracked": len(stats.entries),
+        "max_entries": stats.max_entries,
+        "evicted": stats.evicted,
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def executor_usage(request):
+    """
+    Shared executor accounting for the calling user.
+    """
+    executor = get_executor()
+    return response(True, "Executor usage fetched", {
+        "max_workers": executor.max_workers,
+        "max_pending": executor.max_pending,
+        "usage": executor.usage(executor_caller(request)),
     })
 
 
@@ -299,31 +619,38 @@ def compare_pooling(request, db_id):
         "queue_timeout_ms": user_db.pool_config.queue_timeout_ms,
     }
 
-    query = """
-        SELECT 
-            schemaname, tablename, tableowner,
-            tablespace, hasindexes, hasrules 
-        FROM pg_tables 
-        WHERE schemaname NOT IN ('information_schema', 'pg_catalog')
-        LIMIT 15;
-    """
-
-    process = psutil.Process()
-    
-    # With Pooler
-    cpu_before = psutil.cpu_percent(interval=0.1)
-    mem_before = process.memory_info().rss / (1024 * 1024)
-    start_time = time.time()
+    statements = load_statements(request, user_db, num_requests)
+    if statements is None:
+        return response(False, "Workload not found", None, 404)
 
-    pooler = ConnectionPooler(user_db, custom_config)
-    pooler_results = pooler.execute_requests(query, num_requests)
+    try:
+        trials = int(request.data.get("trials", 5))
+        seed = request.data.get("seed")
+        seed = int(seed) if seed is not None else None
+    except (TypeError, ValueError):
+        return response(False, "trials and seed must be integers", None, 400)
+    if not 1 <= trials <= MAX_AB_TRIALS:
+        return response(False, f"trials must be between 1 and {MAX_AB_TRIALS}", None, 400)
+
+    # Optional tracemalloc accounting of Python allocations (adds overhead)
+    trace_allocations = flag(request, "trace_allocations")
+    profiler = profiler_for(request)
+
+    # Interleaved, randomised trials of both modes with identical statements
+    comparison_run = InterleavedComparison(
+        user_db, statements, custom_config, caller=executor_caller(request),
+        trials=trials, seed=seed, trace_allocations=trace_allocations,
+    )
+    with profiler or nullcontext():
+        ab_test = comparison_run.run()
 
-    total_time_pooler = (time.time() - start_time) * 1000
-    cpu_after = psutil.cpu_percent(interval=0.1)
-    mem_after = process.memory_info().rss / (1024 * 1024)
+    # Detailed figures come from each mode's median trial
+    pooler_results = comparison_run.median_trial(POOLED)
+    pooler_resources = pooler_results.pop("resources")
+    total_time_pooler = pooler_results["total_execution_time_ms"]
 
-    pooler_cpu = round((cpu_after + cpu_before) / 2, 2)
-    pooler_mem_usage = round(mem_after - mem_before, 2)
+    pooler_cpu = pooler_resources["cpu_percent"]
+    pooler_mem_usage = pooler_resources["memory_mb"]
     
     connections_created_pooler = pooler_results["connections_created"]
     connections_reused = pooler_results["connections_reused"]
@@ -334,41 +661,14 @@ def compare_pooling(request, db_id):
         if connections_created_pooler > 0 else 0
     )
 
-    # Without Pooler
-    successful_from_pooler = pooler_results["successful_requests"]
-    cpu_before2 = psutil.cpu_percent(interval=0.1)
-    mem_before2 = process.memory_info().rss / (1024 * 1024)
-    start_time2 = time.time()
+    direct_results = comparison_run.median_trial(DIRECT)
+    direct_resources = direct_results["resources"]
+    success_count_direct = direct_results["successful_requests"]
+    total_time_direct = direct_results["total_execution_time_ms"]
 
-    success_count_direct = 0
-    def execute_direct_query():
-        nonlocal success_count_direct
-        try:
-            execute_db_query(user_db, query)
-            success_count_direct += 1
-        except Exception as e:
-            print(f"Direct query error: {e}")
-
-    with concurrent.futures.ThreadPoolExecutor(
-        max_workers=min(successful_from_pooler, 20)
-    ) as executor:
-        futures = [
-            executor.submit(execute_direct_query) 
-            for _ in range(successful_from_pooler)
-        ]
-        for f in futures:
-            try:
-                f.result(timeout=10)
-            except Exception:
-                pass
-
-    total_time_direct = (time.time() - start_time2) * 1000
-    cpu_after2 = psutil.cpu_percent(interval=0.1)
-    mem_after2 = process.memory_info().rss / (1024 * 1024)
+    direct_cpu = direct_resources["cpu_percent"]
+    direct_mem_usage = direct_resources["memory_mb"]
 
-    direct_cpu = round((cpu_after2 + cpu_before2) / 2, 2)
-    direct_mem_usage = round(mem_after2 - mem_before2, 2)
-    
     # Calculate memory for direct connections
     connections_created_direct = success_count_direct
     memory_per_connection_direct = (
@@ -394,10 +694,7 @@ def compare_pooling(request, db_id):
         round(success_count_direct / (total_time_direct / 1000), 2)
         if total_time_direct > 0 else 0
     )
-    improvement = (
-        round((total_time_direct - total_time_pooler) / total_time_direct * 100, 2)
-        if total_time_direct > 0 else 0
-    )
+    improvement = ab_test["improvement_percent"]
 
     # Response
     comparison = {
@@ -413,7 +710,8 @@ def compare_pooling(request, db_id):
             "connections_reused": connections_reused,
             "connection_reuse_rate": connection_reuse_rate,
             "memory_per_connection_mb": round(memory_per_connection_pooler, 2),
-            "pool_size_configured": custom_config["pool_size"]
+            "pool_size_configured": custom_config["pool_size"],
+            "resources": pooler_resources,
         },
         "without_pooler": {
             "successful_requests": success_count_direct,
@@ -421,20 +719,31 @@ def compare_pooling(request, db_id):
             "memory_usage_mb": direct_mem_usage,
             "efficiency_rps": efficiency_without,
             "total_execution_time_ms": total_time_direct,
-            "success_rate": round(
-                (success_count_direct / successful_from_pooler) * 100, 2
-            ) if successful_from_pooler > 0 else 0,
+            "success_rate": round((success_count_direct / num_requests) * 100, 2),
             "connections_created": connections_created_direct,
             "memory_per_connection_mb": round(memory_per_connection_direct, 2),
-            "estimated_memory_all_requests_mb": round(estimated_direct_memory, 2)
+            "estimated_memory_all_requests_mb": round(estimated_direct_memory, 2),
+            "resources": direct_resources,
         },
         "improvement_percent": improvement,
+        "ab_test": ab_test,
         "resource_comparison": {
             "cpu_saving_percent": round(
                 max(0, (direct_cpu - pooler_cpu) / direct_cpu * 100), 2
             ) if direct_cpu else 0,
             "memory_saving_percent": memory_saving_percent,
             "memory_saved_mb": round(memory_saved, 2),
+            "cpu_time_saved_s": round(
+                direct_resources["cpu_time_s"] - pooler_resources["cpu_time_s"], 4
+            ),
+            "client_sockets_peak": {
+                "with_pooler": pooler_resources["client_sockets_peak"],
+                "without_pooler": direct_resources["client_sockets_peak"],
+            },
+            "server_backends_added": {
+                "with_pooler": pooler_resources["server_backends_added"],
+                "without_pooler": direct_resources["server_backends_added"],
+            },
             "connection_efficiency": {
                 "reuse_rate_percent": connection_reuse_rate,
                 "connections_saved": connections_reused,
@@ -451,12 +760,141 @@ def compare_pooling(request, db_id):
             f"Connection pooling created {connections_created_pooler} connections (out of {custom_config['pool_size']} max) "
             f"and reused them {connections_reused} times ({connection_reuse_rate}% reuse rate). "
             f"This saved approximately {round(memory_saved, 2)}MB of memory "
-            f"and improved performance by {improvement}% compared to creating new connections for each request."
+            f"and improved performance by {improvement}% compared to creating new connections for each request "
+            f"(median of {trials} interleaved trials, Mann-Whitney p={ab_test['mann_whitney']['p_value']}"
+            f"{'' if ab_test['significant'] else ', not significant'})."
         ),
     }
+    if profiler:
+        comparison["profile"] = profiler.report(profiler_top_n())
 
     return response(
         True, 
         "Comparison completed with actual connection reuse tracking", 
         comparison
-    )
\ No newline at end of file
+    )
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def sweep_pooler(request, db_id):
+    """
+    Run the test workload across several pool configurations and recommend one.
+    mode "grid" tries every pool_sizes x queue_sizes pair; mode "binary" searches
+    pool sizes between min_pool_size and max_pool_size. With apply=true the
+    recommended config is saved and pushed into the live pool.
+    """
+    try:
+        user_db = UserDatabase.objects.select_related("pool_config").get(id=db_id, user=request.user)
+    except UserDatabase.DoesNotExist:
+        return response(False, "Database not found", None, 404)
+
+    num_requests = int(request.data.get("num_requests", 100))
+    mode = request.data.get("mode", "grid")
+    current = user_db.pool_config
+    queue_timeout_ms = int(request.data.get("queue_timeout_ms", current.queue_timeout_ms))
+
+    statements = load_statements(request, user_db, num_requests)
+    if statements is None:
+        return response(False, "Workload not found", None, 404)
+
+    sweep = PoolSweep(user_db, statements, queue_timeout_ms,
+                      caller=executor_caller(request))
+    if mode == "binary":
+        min_pool = int(request.data.get("min_pool_size", 1))
+        max_pool = int(request.data.get("max_pool_size", 50))
+        if not 1 <= min_pool <= max_pool:
+            return response(False, "min_pool_size must be between 1 and max_pool_size", None, 400)
+        queue_size = int(request.data.get("queue_size", current.queue_size))
+        if queue_size < 1:
+            return response(False, "queue_size must be at least 1", None, 400)
+        result = sweep.run_binary(min_pool, max_pool, queue_size)
+    else:
+        pool_sizes = [int(v) for v in request.data.get("pool_sizes", [5, 10, 20, 40])]
+        queue_sizes = [int(v) for v in request.data.get("queue_sizes", [current.queue_size])]
+        if not pool_sizes or not queue_sizes or len(pool_sizes) * len(queue_sizes) > MAX_SWEEP_POINTS:
+            return response(False, f"Sweep must have between 1 and {MAX_SWEEP_POINTS} points", None, 400)
+        if min(pool_sizes) < 1 or min(queue_sizes) < 1:
+            return response(False, "pool_sizes and queue_sizes must be at least 1", None, 400)
+        result = sweep.run_grid(pool_sizes, queue_sizes)
+
+    recommended = result["recommended_config"]
+    result["applied"] = False
+    if recommended and flag(request, "apply"):
+        for attr, value in recommended.items():
+            setattr(current, attr, value)
+        current.save()
+        refresh_pooler(user_db)
+        result["applied"] = True
+
+    return response(True, "Pool sweep completed", result)
+
+
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def capture_queries(request, db_id):
+    """
+    GET lists captured traces for a database.
+    POST {"action": "start"} begins capturing every pooled statement;
+    POST {"action": "stop"} ends the current capture.
+    """
+    try:
+        user_db = UserDatabase.objects.get(id=db_id, user=request.user)
+    except UserDatabase.DoesNotExist:
+        return response(False, "Database not found", None, 404)
+
+    directory = get_engine_config("capture")["directory"]
+    if request.method == "GET":
+        pooler = find_pooler(user_db.id)
+        return response(True, "Captures fetched", {
+            "capturing": pooler.capture.name if pooler and pooler.capture else None,
+            "traces": list_traces(directory, f"db{db_id}-"),
+        })
+
+    action = request.data.get("action")
+    if action == "start":
+        writer = get_pooler(user_db).start_capture(f"db{db_id}-{time.strftime('%Y%m%d-%H%M%S')}")
+        return response(True, "Capture started", {"trace": writer.name})
+    if action == "stop":
+        pooler = find_pooler(user_db.id)
+        writer = pooler.stop_capture() if pooler is not None else None
+        if writer is None:
+            return response(False, "No capture is running", None, 400)
+        return response(True, "Capture stopped", {
+            "trace": writer.name,
+            "events": writer.events,
+            "files": [os.path.basename(p) for p in trace_files(directory, writer.name)],
+        })
+    return response(False, "action must be 'start' or 'stop'", None, 400)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def replay_queries(request, db_id):
+    """
+    Replay a captured trace of this database against `target_db_id` (default: itself).
+    `speed` is a multiplier of the recorded timing, or "max" for no waiting.
+    """
+    trace = str(request.data.get("trace", ""))
+    if not TRACE_NAME.match(trace) or not trace.startswith(f"db{db_id}-"):
+        return response(False, "Invalid trace name", None, 400)
+    try:
+        UserDatabase.objects.get(id=db_id, user=request.user)
+        target_db = UserDatabase.objects.get(
+            id=request.data.get("target_db_id", db_id), user=request.user
+        )
+    except UserDatabase.DoesNotExist:
+        return response(False, "Database not found", None, 404)
+
+    paths = trace_files(get_engine_config("capture")["directory"], trace)
+    if not paths:
+        return response(False, "Trace not found", None, 404)
+
+    speed = request.data.get("speed", 1)
+    speed = None if str(speed).lower() == "max" else float(speed)
+    if speed is not None and speed <= 0:
+        return response(False, "speed must be positive or 'max'", None, 400)
+
+    replayer = TraceReplayer(
+        get_pooler(target_db), read_events(paths), speed, caller=executor_caller(request)
+    )
+    return response(True, "Replay completed", replayer.run())